@@ -6,4 +6,17 @@ from .models import (
     JobStatus,
     JobDefinition,
 )
-from .main import app
+from .clock import Clock, VirtualClock
+from .coordination import Coordinator, SQLiteCoordinator
+from .logger import disable_async_logging, enable_async_logging
+from .monitor import LoopMonitor
+from .persistence import StateJournal
+
+
+def __getattr__(name: str):
+    # the web layer is only imported by those using it
+    if name in ("app", "create_app"):
+        from . import main
+
+        return getattr(main, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
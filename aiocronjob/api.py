@@ -1,41 +1,118 @@
-from typing import List
+import json
+from typing import Callable, List, Literal, Optional
 
-from starlite import HTTPException, Router, get, Provide, Stream, MediaType
+from starlite import (
+    HTTPException,
+    Router,
+    get,
+    Provide,
+    Request,
+    Response,
+    Stream,
+    MediaType,
+)
 from .dependencies import get_manager
 from .exceptions import (
     JobNotFoundException,
     JobNotRunningException,
     JobAlreadyRunningException,
+    JobNotProfilableException,
 )
 from .manager import Manager
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .models import EventType, JobStatus
+
 
+@get("/jobs", media_type=MediaType.JSON)
+async def get_jobs(
+    request: Request,
+    manager: Manager,
+    status: Optional[JobStatus] = None,
+    name_prefix: Optional[str] = None,
+    cursor: int = 0,
+    limit: Optional[int] = None,
+) -> Response:
+    """List the registered jobs info, a page at a time with ``limit``; the
+    cursor of the next page is sent in the ``X-Next-Cursor`` header"""
+    if cursor < 0:
+        raise HTTPException(status_code=400, detail="The cursor must not be negative.")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="The limit must be positive.")
+    etag = f'"{manager.jobs_version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(content=b"", status_code=304, headers={"ETag": etag})
 
-@get("/jobs", dependencies={"manager": Provide(get_manager)}, media_type=MediaType.JSON)
-async def get_jobs(manager: Manager) -> List[dict]:
-    """List all registered jobs info"""
-    return [
-        job.dict(exclude={"definition": {"async_callable"}})
-        for job in manager.get_jobs_info()
-    ]
+    jobs, next_cursor = manager.get_serialized_jobs(
+        cursor=cursor, limit=limit, status=status, name_prefix=name_prefix
+    )
+    headers = {"ETag": etag}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return Response(
+        content=b"[" + b",".join(jobs) + b"]",
+        media_type=MediaType.JSON,
+        headers=headers,
+    )
 
 
 @get(
     "/jobs/{job_name:str}",
-    dependencies={"manager": Provide(get_manager)},
     media_type=MediaType.JSON,
 )
-async def get_job_info(job_name: str, manager: Manager) -> dict:
+async def get_job_info(job_name: str, manager: Manager) -> Response:
     """Get a job info"""
     try:
-        job_info = manager.get_job_info(job_name)
+        job_info = manager.get_serialized_job(job_name)
+    except JobNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(content=job_info, media_type=MediaType.JSON)
+
+
+@get(
+    "/jobs/{job_name:str}/upcoming",
+    media_type=MediaType.JSON,
+)
+async def get_job_upcoming_starts(
+    job_name: str, manager: Manager, count: int = 10
+) -> List[float]:
+    """Get the timestamps of the next scheduled starts of a job, 64 at most"""
+    if count < 1:
+        raise HTTPException(status_code=400, detail="The count must be positive.")
+    try:
+        return manager.get_job_upcoming_starts(job_name, count)
     except JobNotFoundException as e:
         raise HTTPException(status_code=404, detail=str(e))
-    return job_info.dict(exclude={"definition": {"async_callable"}})
+
+
+@get(
+    "/jobs/{job_name:str}/logs",
+    media_type=MediaType.JSON,
+)
+async def get_job_logs(
+    job_name: str,
+    manager: Manager,
+    since: int = 0,
+    limit: int = 100,
+    event_type: Optional[EventType] = None,
+) -> dict:
+    """Get a page of a job's logs, oldest first"""
+    try:
+        manager.get_job_info(job_name)
+    except JobNotFoundException as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    logs = manager.get_logs(
+        since=since, job_name=job_name, event_type=event_type, limit=limit
+    )
+    evicted = manager.get_evicted_logs(since)
+    return {
+        "logs": [log.to_dict() for log in logs],
+        "next_since": logs[-1].seq if logs else since,
+        "evicted": evicted.dict() if evicted else None,
+    }
 
 
 @get(
     "/jobs/{job_name:str}/cancel",
-    dependencies={"manager": Provide(get_manager)},
     media_type=MediaType.JSON,
 )
 async def cancel_job(job_name: str, manager: Manager) -> None:
@@ -50,7 +127,6 @@ async def cancel_job(job_name: str, manager: Manager) -> None:
 
 @get(
     "/jobs/{job_name:str}/start",
-    dependencies={"manager": Provide(get_manager)},
     media_type=MediaType.JSON,
 )
 async def start_job(job_name: str, manager: Manager) -> None:
@@ -63,13 +139,154 @@ async def start_job(job_name: str, manager: Manager) -> None:
     return None
 
 
-@get("/log-stream", dependencies={"manager": Provide(get_manager)})
-async def stream_logs(manager: Manager) -> Stream:
-    log_generator = manager.generate_logs(as_json_lines=True)
+@get(
+    "/jobs/{job_name:str}/profile",
+    media_type=MediaType.JSON,
+)
+async def profile_job(job_name: str, manager: Manager, runs: int = 1) -> None:
+    """Profile the next runs of a job"""
+    try:
+        manager.profile_job(job_name, runs)
+    except JobNotFoundException as e:
+        raise HTTPException(detail=str(e), status_code=404)
+    except JobNotProfilableException as e:
+        raise HTTPException(detail=str(e), status_code=400)
+    return None
+
+
+@get(
+    "/jobs/{job_name:str}/profile/result",
+)
+async def get_job_profile(
+    job_name: str,
+    manager: Manager,
+    format: Literal["text", "pstats"] = "text",
+    sort: str = "cumulative",
+    limit: int = 50,
+) -> Response:
+    """Download the profile of a job, as text or as a ``.prof`` file"""
+    try:
+        profile = manager.get_job_profile(job_name)
+    except JobNotFoundException as e:
+        raise HTTPException(detail=str(e), status_code=404)
+    if profile is None:
+        raise HTTPException(detail="No profiled run of this job yet", status_code=404)
+
+    if format == "pstats":
+        return Response(
+            content=profile.as_pstats(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{job_name}.prof"'},
+        )
+    return Response(content=profile.as_text(sort, limit), media_type=MediaType.TEXT)
+
+
+@get("/log-stream")
+async def stream_logs(
+    manager: Manager,
+    since: int = 0,
+    job_name: Optional[str] = None,
+    event_type: Optional[EventType] = None,
+    report_evicted: bool = False,
+) -> Stream:
+    log_generator = manager.generate_logs(
+        as_json_lines=True,
+        since=since,
+        job_name=job_name,
+        event_type=event_type,
+        report_evicted=report_evicted,
+    )
     return Stream(iterator=log_generator)
 
 
-api_router = Router(
-    "/api",
-    route_handlers=[get_jobs, get_job_info, cancel_job, start_job, stream_logs],
+@get("/job-stream")
+async def stream_job_updates(
+    manager: Manager, jobs: Optional[List[str]] = None
+) -> Stream:
+    """Server-sent events: a ``snapshot`` of the jobs info, then the fields of
+    the jobs that ``changes``, optionally only for some ``jobs``"""
+
+    async def events():
+        async for kind, job_updates in manager.generate_job_updates(
+            set(jobs) if jobs else None
+        ):
+            data = json.dumps(job_updates, separators=(",", ":"))
+            yield f"event: {kind}\ndata: {data}\n\n".encode()
+
+    return Stream(
+        iterator=events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@get(
+    "/metrics",
+    media_type=METRICS_CONTENT_TYPE,
+)
+async def get_metrics(manager: Manager) -> str:
+    """Get the metrics in the Prometheus text format"""
+    return manager.get_metrics()
+
+
+@get(
+    "/loop-lag",
+    media_type=MediaType.JSON,
+)
+async def get_loop_lag(manager: Manager) -> dict:
+    """Get the event loop lag and the latest stalls, with the tasks blamed"""
+    stats = manager.get_loop_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="The loop is not monitored.")
+    return stats
+
+
+@get(
+    "/dag",
+    media_type=MediaType.JSON,
 )
+async def get_dag(manager: Manager, limit: int = 10) -> dict:
+    """Get the job dependency graph and its latest runs, newest first"""
+    return {"jobs": manager.get_dag(), "runs": manager.get_dag_runs(limit)}
+
+
+@get(
+    "/dag/runs/{run_id:int}",
+    media_type=MediaType.JSON,
+)
+async def get_dag_run(run_id: int, manager: Manager) -> dict:
+    """Get the status of each job of a run of the dependency graph"""
+    dag_run = manager.get_dag_run(run_id)
+    if dag_run is None:
+        raise HTTPException(status_code=404, detail="Unknown run.")
+    return dag_run
+
+
+route_handlers = [
+    get_jobs,
+    get_job_info,
+    get_job_upcoming_starts,
+    get_job_logs,
+    cancel_job,
+    start_job,
+    profile_job,
+    get_job_profile,
+    stream_logs,
+    stream_job_updates,
+    get_metrics,
+    get_loop_lag,
+    get_dag,
+    get_dag_run,
+]
+
+
+def create_api_router(provide_manager: Callable[[], Manager]) -> Router:
+    """The API routes, served by the manager ``provide_manager`` returns."""
+    return Router(
+        "/api",
+        route_handlers=route_handlers,
+        dependencies={"manager": Provide(provide_manager)},
+    )
+
+
+api_router = create_api_router(get_manager)
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any, Generic, Set, TypeVar
+
+from .models import SlowConsumerPolicy
+
+T = TypeVar("T")
+
+
+class Subscription(Generic[T]):
+    def __init__(self, maxsize: int):
+        self.queue: "asyncio.Queue[T]" = asyncio.Queue(maxsize)
+        self.lagging: bool = False
+        self.dropped: bool = False
+
+    def reset(self) -> None:
+        """Forget the queued items and the lagging mark, before a resync."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.lagging = False
+
+
+class Broadcaster(Generic[T]):
+    """Publishes every item once to all the subscribers' bounded queues.
+
+    A subscriber whose queue is full is either dropped or marked as lagging,
+    depending on the slow consumer policy. A lagging subscriber stops receiving
+    items until it resyncs itself from the history and calls ``reset()``.
+    """
+
+    def __init__(
+        self, maxsize: int = 1000, slow_consumer_policy: SlowConsumerPolicy = "lag"
+    ):
+        self._maxsize = maxsize
+        self._slow_consumer_policy = slow_consumer_policy
+        self._subscribers: Set[Subscription[T]] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription[T]:
+        subscription: Subscription[T] = Subscription(self._maxsize)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription[Any]) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, item: T) -> None:
+        for subscription in list(self._subscribers):
+            if subscription.lagging:
+                continue
+            try:
+                subscription.queue.put_nowait(item)
+            except asyncio.QueueFull:
+                if self._slow_consumer_policy == "drop":
+                    subscription.dropped = True
+                    self.unsubscribe(subscription)
+                else:
+                    subscription.lagging = True
@@ -0,0 +1,105 @@
+import asyncio
+import datetime
+import time
+from typing import Optional
+
+import pytz
+
+from .timers import TimerHeap
+
+
+class Clock:
+    """Wall time and timed waits, as seen by a ``Manager``."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.time(), tz=pytz.utc)
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        """Wait for ``event`` at most ``timeout`` seconds; return whether it is set."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+class VirtualClock(Clock):
+    """A simulated clock, for tests and capacity planning.
+
+    Time only moves with ``advance()`` or, with ``autojump``, as soon as the
+    event loop has nothing left to run: the clock then jumps straight to the
+    earliest deadline someone sleeps until. Simulated jobs must wait through
+    the manager's clock, since time spent in ``asyncio.sleep``, threads or
+    processes goes unnoticed.
+    """
+
+    def __init__(self, start: float = 0.0, autojump: bool = True):
+        self._time = start
+        self._autojump = autojump
+        self._waiters = TimerHeap()
+        self._autojump_task: Optional[asyncio.Task] = None
+
+    def time(self) -> float:
+        return self._time
+
+    def advance(self, seconds: float) -> None:
+        """Move the time forward, waking up the sleepers whose deadline passed."""
+        self._time += seconds
+        for future in self._waiters.pop_due(self._time):
+            if not future.done():
+                future.set_result(None)
+
+    async def sleep(self, delay: float) -> None:
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        timer = self._waiters.push(self._time + delay, future)
+        if self._autojump and self._autojump_task is None:
+            self._autojump_task = asyncio.create_task(self._jump_forever())
+        try:
+            await future
+        finally:
+            timer.cancel()
+
+    async def wait(self, event: asyncio.Event, timeout: Optional[float]) -> bool:
+        if timeout is None:
+            await event.wait()
+            return True
+
+        waiter = asyncio.ensure_future(event.wait())
+        sleeper = asyncio.ensure_future(self.sleep(timeout))
+        try:
+            await asyncio.wait([waiter, sleeper], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+            sleeper.cancel()
+        return event.is_set()
+
+    async def _settle(self) -> None:
+        """Let everything ready to run in the event loop run first."""
+        loop = asyncio.get_running_loop()
+        # the ready queue is an implementation detail of the default event loop
+        ready = getattr(loop, "_ready", None)
+        for _ in range(100):
+            await asyncio.sleep(0)
+            if ready is not None and not ready:
+                return
+
+    async def _jump_forever(self) -> None:
+        try:
+            while True:
+                await self._settle()
+                deadline = self._waiters.next_deadline()
+                if deadline is None:
+                    return
+                self.advance(max(deadline - self._time, 0))
+        finally:
+            self._autojump_task = None
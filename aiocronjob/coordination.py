@@ -0,0 +1,161 @@
+import asyncio
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .logger import logger
+from .models import CoordinationMode
+
+
+class Coordinator:
+    """Decides which of several replicas of a manager runs a scheduled start."""
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
+        ...
+
+    async def claim(self, job_name: str, fire_time: float) -> bool:
+        """Whether this replica should start ``job_name`` for ``fire_time``."""
+        raise NotImplementedError
+
+
+class SQLiteCoordinator(Coordinator):
+    """Coordinates the replicas sharing a SQLite database file.
+
+    In ``claim`` mode each scheduled start is claimed with a row keyed on the job
+    name and fire time, so every run happens once and replicas share the work.
+    In ``leader`` mode the replica holding the leader lease runs everything; the
+    lease is renewed in the background every ``renew_interval`` seconds, so that
+    ``claim()`` never touches the database, and a new leader takes over at most
+    ``lease_ttl`` seconds after the previous one stopped renewing it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: CoordinationMode = "claim",
+        node_id: Optional[str] = None,
+        lease_ttl: float = 15.0,
+        renew_interval: Optional[float] = None,
+        claims_retention: float = 24 * 3600,
+    ):
+        self.path = path
+        self.mode = mode
+        self.node_id = node_id or uuid.uuid4().hex
+        self.lease_ttl = lease_ttl
+        self.renew_interval = renew_interval or lease_ttl / 3
+        self.claims_retention = claims_retention
+
+        # the connection is only ever used from this executor's single thread
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="aiocronjob-coordinator"
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        self._leader_until: float = 0.0
+        self._renew_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return time.time() < self._leader_until
+
+    async def _execute(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connect(self) -> None:
+        self._connection = sqlite3.connect(self.path, timeout=self.lease_ttl)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS claims (
+                job_name TEXT NOT NULL,
+                fire_time INTEGER NOT NULL,
+                node_id TEXT NOT NULL,
+                claimed_at REAL NOT NULL,
+                PRIMARY KEY (job_name, fire_time)
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                node_id TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            """
+        )
+
+    def _claim(self, job_name: str, fire_time: float) -> bool:
+        with self._connection:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO claims VALUES (?, ?, ?, ?)",
+                (job_name, round(fire_time * 1000), self.node_id, time.time()),
+            )
+        return cursor.rowcount == 1
+
+    def _renew(self) -> float:
+        """Take or extend the leader lease; return its expiry, or 0 if not held."""
+        requested_at = time.time()
+        # counted from before the request, to stay on the safe side
+        expires_at = requested_at + self.lease_ttl
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO leases VALUES ('leader', ?, ?)",
+                (self.node_id, expires_at),
+            )
+            self._connection.execute(
+                "UPDATE leases SET node_id = ?, expires_at = ? "
+                "WHERE name = 'leader' AND (node_id = ? OR expires_at < ?)",
+                (self.node_id, expires_at, self.node_id, requested_at),
+            )
+            (node_id,) = self._connection.execute(
+                "SELECT node_id FROM leases WHERE name = 'leader'"
+            ).fetchone()
+        return expires_at if node_id == self.node_id else 0.0
+
+    def _release(self) -> None:
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM leases WHERE name = 'leader' AND node_id = ?",
+                (self.node_id,),
+            )
+
+    def _prune(self) -> None:
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM claims WHERE claimed_at < ?",
+                (time.time() - self.claims_retention,),
+            )
+
+    async def _renew_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.renew_interval)
+            try:
+                if self.mode == "leader":
+                    self._leader_until = await self._execute(self._renew)
+                await self._execute(self._prune)
+            except sqlite3.Error as e:
+                logger.error("[COORDINATION] could not renew the lease: %s", e)
+
+    async def start(self) -> None:
+        await self._execute(self._connect)
+        if self.mode == "leader":
+            self._leader_until = await self._execute(self._renew)
+        self._renew_task = asyncio.create_task(self._renew_forever())
+
+    async def stop(self) -> None:
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            self._renew_task = None
+        if self._connection is None:
+            return
+        if self.mode == "leader" and self._leader_until:
+            self._leader_until = 0.0
+            await self._execute(self._release)
+        await self._execute(self._connection.close)
+        self._connection = None
+
+    async def claim(self, job_name: str, fire_time: float) -> bool:
+        if self.mode == "leader":
+            return self.is_leader
+        return await self._execute(self._claim, job_name, fire_time)
@@ -11,3 +11,8 @@ class JobNotFoundException(Exception):
 class JobNotRunningException(Exception):
     def __str__(self):
         return "Job not running"
+
+
+class JobNotProfilableException(Exception):
+    def __str__(self):
+        return "Only asyncio jobs run in the manager's event loop can be profiled"
@@ -0,0 +1,138 @@
+import asyncio
+import functools
+import inspect
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .models import JobDefinition
+
+_mp_context = multiprocessing.get_context("spawn")
+
+
+def accepts_cancel_event(func: Callable) -> bool:
+    try:
+        return "cancel_event" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _call_and_send(func: Callable[[], Any], conn) -> None:
+    try:
+        conn.send((True, func()))
+    except BaseException as e:
+        conn.send((False, e))
+    finally:
+        conn.close()
+
+
+class Executors:
+    """Runs the sync callables of ``thread`` and ``process`` jobs off the event
+    loop, on pools created the first time they are needed.
+
+    Cancelling a run that has not started yet drops it. A thread job already
+    running is asked to stop through its ``cancel_event`` argument, if it takes
+    one, and the run ends when the thread returns. A process job registered with
+    ``terminate_on_cancel`` or a ``timeout`` runs in its own process, which is
+    terminated; at most ``process_pool_size`` of these processes run at once.
+    """
+
+    def __init__(
+        self,
+        thread_pool_size: Optional[int] = None,
+        process_pool_size: Optional[int] = None,
+    ):
+        self._thread_pool_size = thread_pool_size
+        self._process_pool_size = process_pool_size
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._own_process_slots: Optional[asyncio.Semaphore] = None
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self._thread_pool_size, thread_name_prefix="aiocronjob"
+            )
+        return self._thread_pool
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self._process_pool_size, mp_context=_mp_context
+            )
+        return self._process_pool
+
+    def _get_own_process_slots(self) -> asyncio.Semaphore:
+        if self._own_process_slots is None:
+            # the size ProcessPoolExecutor defaults to
+            size = self._process_pool_size or os.cpu_count() or 1
+            self._own_process_slots = asyncio.Semaphore(size)
+        return self._own_process_slots
+
+    async def run(self, definition: JobDefinition) -> Any:
+        if definition.executor == "thread":
+            return await self._run_in_thread(definition.async_callable)
+        if definition.terminate_on_cancel or definition.timeout is not None:
+            return await self._run_in_own_process(definition.async_callable)
+        return await self._run_in_pool(
+            self._get_process_pool(), definition.async_callable
+        )
+
+    @staticmethod
+    async def _run_in_pool(
+        pool: Executor, func: Callable[[], Any], on_cancel: Callable[[], None] = None
+    ) -> Any:
+        future = pool.submit(func)
+        result = asyncio.wrap_future(future)
+        try:
+            return await asyncio.shield(result)
+        except asyncio.CancelledError:
+            # a run that already started cannot be interrupted, so it is waited for
+            if not future.cancel():
+                if on_cancel is not None:
+                    on_cancel()
+                await asyncio.wait([result])
+            raise
+
+    async def _run_in_thread(self, func: Callable[[], Any]) -> Any:
+        cancel_event = threading.Event()
+        if accepts_cancel_event(func):
+            func = functools.partial(func, cancel_event=cancel_event)
+        return await self._run_in_pool(
+            self._get_thread_pool(), func, on_cancel=cancel_event.set
+        )
+
+    async def _run_in_own_process(self, func: Callable[[], Any]) -> Any:
+        # each process also ties up a thread of the loop's default executor
+        async with self._get_own_process_slots():
+            return await self._spawn_and_wait(func)
+
+    @staticmethod
+    async def _spawn_and_wait(func: Callable[[], Any]) -> Any:
+        loop = asyncio.get_running_loop()
+        parent_conn, child_conn = _mp_context.Pipe(duplex=False)
+        process = _mp_context.Process(
+            target=_call_and_send, args=(func, child_conn), daemon=True
+        )
+        process.start()
+        child_conn.close()
+        try:
+            ok, value = await loop.run_in_executor(None, parent_conn.recv)
+        except asyncio.CancelledError:
+            process.terminate()
+            raise
+        finally:
+            await loop.run_in_executor(None, process.join)
+            parent_conn.close()
+        if not ok:
+            raise value
+        return value
+
+    def shutdown(self, wait: bool = True) -> None:
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait, cancel_futures=True)
+        self._thread_pool = None
+        self._process_pool = None
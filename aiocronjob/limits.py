@@ -0,0 +1,21 @@
+class CapacityLimiter:
+    """Non-blocking counting semaphore bounding how many job runs hold it.
+
+    Runs that find it full are queued by the manager instead of awaiting it, so
+    they can be dispatched in deadline order once capacity is released.
+    """
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("Capacity must be at least 1.")
+        self.size = size
+        self.in_use: int = 0
+
+    def has_capacity(self) -> bool:
+        return self.in_use < self.size
+
+    def acquire(self) -> None:
+        self.in_use += 1
+
+    def release(self) -> None:
+        self.in_use -= 1
@@ -0,0 +1,170 @@
+import bisect
+import json
+from typing import Dict, List, Optional, Tuple
+
+from .models import EventType, JobDefinition, JobLog
+
+
+class LogRecord:
+    """Compact in-memory form of a ``JobLog``.
+
+    It references the job definition instead of copying its fields, and it is
+    serialized to JSON at most once, however many streams send it.
+    """
+
+    __slots__ = (
+        "seq",
+        "timestamp",
+        "event_type",
+        "definition",
+        "error",
+        "attempt",
+        "_json_line",
+    )
+
+    def __init__(
+        self,
+        timestamp: float,
+        event_type: EventType,
+        definition: JobDefinition,
+        error: str = None,
+        attempt: int = None,
+    ):
+        self.seq: int = 0
+        self.timestamp = timestamp
+        self.event_type = event_type
+        self.definition = definition
+        self.error = error
+        self.attempt = attempt
+        self._json_line: Optional[bytes] = None
+
+    @property
+    def job_name(self) -> str:
+        return self.definition.name
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "event_type": self.event_type,
+            "job_name": self.definition.name,
+            "crontab": self.definition.crontab,
+            "enabled": self.definition.enabled,
+            "error": self.error,
+            "attempt": self.attempt,
+            "timestamp": self.timestamp,
+        }
+
+    def to_job_log(self) -> JobLog:
+        return JobLog.construct(**self.to_dict())
+
+    def json_line(self) -> bytes:
+        if self._json_line is None:
+            self._json_line = json.dumps(self.to_dict()).encode() + b"\n"
+        return self._json_line
+
+
+class _SeqIndex:
+    """Ascending sequence numbers of the logs sharing a key.
+
+    Evicted numbers are always the oldest ones, so they are skipped by moving
+    the head forward and the list is compacted only once in a while.
+    """
+
+    def __init__(self):
+        self._seqs: List[int] = []
+        self._head: int = 0
+
+    def __len__(self) -> int:
+        return len(self._seqs) - self._head
+
+    def append(self, seq: int) -> None:
+        self._seqs.append(seq)
+
+    def evict(self, seq: int) -> None:
+        if self._head < len(self._seqs) and self._seqs[self._head] == seq:
+            self._head += 1
+        if self._head > 1024 and self._head * 2 > len(self._seqs):
+            del self._seqs[: self._head]
+            self._head = 0
+
+    def after(self, seq: int, limit: Optional[int] = None) -> List[int]:
+        start = bisect.bisect_right(self._seqs, seq, lo=self._head)
+        end = None if limit is None else start + limit
+        return self._seqs[start:end]
+
+
+class LogStore:
+    """Ring buffer of the last ``capacity`` logs, numbered with monotonic
+    sequence numbers and indexed by job name and event type."""
+
+    def __init__(self, capacity: int = 10000):
+        if capacity < 1:
+            raise ValueError("Log store capacity must be at least 1.")
+        self.capacity = capacity
+        self._buffer: List[Optional[LogRecord]] = [None] * capacity
+        self.first_seq: int = 1
+        self.last_seq: int = 0
+        self._by_job_name: Dict[str, _SeqIndex] = {}
+        self._by_event_type: Dict[str, _SeqIndex] = {}
+
+    def __len__(self) -> int:
+        return self.last_seq - self.first_seq + 1
+
+    def append(self, log: LogRecord) -> int:
+        self.last_seq += 1
+        log.seq = self.last_seq
+
+        position = log.seq % self.capacity
+        evicted = self._buffer[position]
+        if evicted is not None:
+            self._by_job_name[evicted.job_name].evict(evicted.seq)
+            self._by_event_type[evicted.event_type].evict(evicted.seq)
+            self.first_seq = evicted.seq + 1
+        self._buffer[position] = log
+
+        self._by_job_name.setdefault(log.job_name, _SeqIndex()).append(log.seq)
+        self._by_event_type.setdefault(log.event_type, _SeqIndex()).append(log.seq)
+        return log.seq
+
+    def get(self, seq: int) -> LogRecord:
+        if not self.first_seq <= seq <= self.last_seq:
+            raise KeyError(seq)
+        return self._buffer[seq % self.capacity]
+
+    def evicted_range(self, since: int) -> Optional[Tuple[int, int]]:
+        """The range of sequence numbers after ``since`` that were evicted."""
+        if since + 1 < self.first_seq:
+            return since + 1, self.first_seq - 1
+        return None
+
+    def query(
+        self,
+        since: int = 0,
+        job_name: str = None,
+        event_type: EventType = None,
+        limit: int = None,
+    ) -> List[LogRecord]:
+        """Logs with a sequence number greater than ``since``, oldest first."""
+        since = max(since, self.first_seq - 1)
+
+        indexes = []
+        if job_name is not None:
+            indexes.append(self._by_job_name.get(job_name, _SeqIndex()))
+        if event_type is not None:
+            indexes.append(self._by_event_type.get(event_type, _SeqIndex()))
+
+        if not indexes:
+            end = self.last_seq if limit is None else min(self.last_seq, since + limit)
+            return [self.get(seq) for seq in range(since + 1, end + 1)]
+
+        index = min(indexes, key=len)
+        if len(indexes) == 1:
+            return [self.get(seq) for seq in index.after(since, limit)]
+
+        logs = [
+            log
+            for log in map(self.get, index.after(since))
+            if job_name in (None, log.job_name)
+            and event_type in (None, log.event_type)
+        ]
+        return logs if limit is None else logs[:limit]
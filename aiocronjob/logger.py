@@ -1,4 +1,11 @@
+import json
 import logging
+import logging.handlers
+import queue
+import sys
+from typing import Any, Dict, Optional, TextIO
+
+from .models import LogDropPolicy, LogFormat
 
 FORMAT = "[%(levelname)s] %(asctime)s | %(message)s"
 
@@ -9,3 +16,132 @@ logger.setLevel(level="INFO")
 handler = logging.StreamHandler()
 handler.setFormatter(logging.Formatter(FORMAT))
 logger.addHandler(handler)
+
+# the attributes of every record, as opposed to those passed with ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def _fields(formatter: logging.Formatter, record: logging.LogRecord) -> Dict[str, Any]:
+    fields = {
+        "time": formatter.formatTime(record),
+        "level": record.levelname,
+        "message": record.getMessage(),
+    }
+    for key, value in vars(record).items():
+        if key not in _RECORD_ATTRIBUTES:
+            fields[key] = value
+    if record.exc_info:
+        fields["exception"] = formatter.formatException(record.exc_info)
+    return fields
+
+
+def _kv_value(value: Any) -> str:
+    value = str(value)
+    if not value or any(char in value for char in ' "=\n'):
+        return json.dumps(value)
+    return value
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Formats a record as ``key=value`` pairs, including its ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return " ".join(
+            f"{key}={_kv_value(value)}"
+            for key, value in _fields(self, record).items()
+        )
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a JSON object, including its ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(_fields(self, record), default=str)
+
+
+FORMATTERS = {
+    "text": lambda: logging.Formatter(FORMAT),
+    "kv": KeyValueFormatter,
+    "json": JsonFormatter,
+}
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """Hands the records over to a background thread through a bounded queue.
+
+    The records are formatted by that thread, not by the logging call. When the
+    queue is full, the new record is dropped with ``drop_new``, the oldest one
+    with ``drop_oldest``, and the logging call waits with ``block``. ``dropped``
+    counts the records lost.
+    """
+
+    def __init__(self, maxsize: int = 10000, drop_policy: LogDropPolicy = "drop_new"):
+        super().__init__(queue.Queue(maxsize))
+        self.drop_policy = drop_policy
+        self.dropped: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the record stays in this process, so it needs neither formatting
+        # nor pickling
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.drop_policy == "block":
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+            return
+        except queue.Full:
+            pass
+        if self.drop_policy == "drop_oldest":
+            try:
+                self.queue.get_nowait()
+                self.queue.put_nowait(record)
+            except (queue.Empty, queue.Full):
+                pass
+        # the handler's lock is held, so the count is exact
+        self.dropped += 1
+
+
+class _Listener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # the queue may be full
+        self.queue.put(self._sentinel)
+
+
+_async_handler: Optional[BoundedQueueHandler] = None
+_listener: Optional[_Listener] = None
+
+
+def enable_async_logging(
+    maxsize: int = 10000,
+    drop_policy: LogDropPolicy = "drop_new",
+    format: LogFormat = "text",
+    stream: TextIO = None,
+) -> BoundedQueueHandler:
+    """Write the ``aiocronjob`` logs from a background thread, so that logging
+    never waits for ``stream``, which defaults to ``stderr``."""
+    disable_async_logging()
+    global _async_handler, _listener
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(FORMATTERS[format]())
+    _async_handler = BoundedQueueHandler(maxsize, drop_policy)
+    _listener = _Listener(_async_handler.queue, output)
+    _listener.start()
+    logger.removeHandler(handler)
+    logger.addHandler(_async_handler)
+    return _async_handler
+
+
+def disable_async_logging() -> None:
+    """Write the queued logs, then go back to writing them synchronously."""
+    global _async_handler, _listener
+    if _async_handler is None:
+        return
+    logger.removeHandler(_async_handler)
+    logger.addHandler(handler)
+    _listener.stop()
+    _async_handler = None
+    _listener = None
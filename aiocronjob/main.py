@@ -1,33 +1,66 @@
 import asyncio
-from typing import Dict
+from typing import Dict, Optional
 
 from starlite import Starlite
-from .api import api_router
+from .api import create_api_router
 from .dependencies import get_manager
 from .logger import logger
+from .manager import Manager
 
 _main_task: Dict[str, asyncio.Task] = {}
 
 
-async def init():
-    manager = get_manager()
+async def _start(manager: Optional[Manager], main_task: Dict[str, asyncio.Task]):
     if not manager:
         raise Exception("Please call .set_default() method on your custom manager.")
 
-    global _main_task
-    _main_task["task"] = asyncio.create_task(manager.run())
+    main_task["task"] = asyncio.create_task(manager.run())
 
 
-async def shutdown():
+async def _stop(manager: Manager, main_task: Dict[str, asyncio.Task]):
     logger.info("App is shutting down...")
     logger.info("Shutting down Manager...")
-    manager = get_manager()
     await manager.shutdown()
     logger.info("Shutting down main task...")
     try:
-        await _main_task["task"]
+        await main_task["task"]
     except asyncio.CancelledError:
         logger.info("Shut down complete.")
 
 
-app = Starlite(route_handlers=[api_router], on_startup=[init], on_shutdown=[shutdown])
+async def init():
+    await _start(get_manager(), _main_task)
+
+
+async def shutdown():
+    await _stop(get_manager(), _main_task)
+
+
+def create_app(manager: Optional[Manager] = None) -> Starlite:
+    """Build the web app of ``manager``, which it runs from startup to shutdown.
+
+    Without a manager, the app serves the one set with ``set_default()``.
+    """
+    if manager is None:
+        return Starlite(
+            route_handlers=[create_api_router(get_manager)],
+            on_startup=[init],
+            on_shutdown=[shutdown],
+        )
+
+    main_task: Dict[str, asyncio.Task] = {}
+
+    async def on_startup():
+        await _start(manager, main_task)
+
+    async def on_shutdown():
+        await _stop(manager, main_task)
+
+    return Starlite(
+        route_handlers=[create_api_router(lambda: manager)],
+        on_startup=[on_startup],
+        on_shutdown=[on_shutdown],
+    )
+
+
+app = create_app()
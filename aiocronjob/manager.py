@@ -1,32 +1,177 @@
 import asyncio
 import functools
-from collections import deque
-from typing import Callable, Optional, Coroutine, List, Dict, Deque
+import itertools
+import json
+import random
+import uuid
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Optional,
+    Coroutine,
+    List,
+    Dict,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from pydantic.json import pydantic_encoder
 
-from crontab import CronTab
+from .broadcast import Broadcaster
+from .clock import Clock
+from .coordination import Coordinator
 from .dependencies import set_manager
 from .exceptions import (
     JobNotFoundException,
     JobAlreadyRunningException,
     JobNotRunningException,
+    JobNotProfilableException,
 )
+from .executors import Executors
+from .limits import CapacityLimiter
+from .log_store import LogRecord, LogStore
 from .logger import logger
-from .models import JobDefinition, JobLog, JobInfo, JobStatus, State, EventType
-from .util import now
+from .metrics import Metrics
+from .monitor import LoopMonitor, TimedCoroutine
+from .persistence import StateJournal
+from .schedule import SCHEDULE_WINDOW_SIZE, start_offset
+from .models import (
+    EvictedLogs,
+    JobDefinition,
+    JobInfo,
+    JobState,
+    JobStatus,
+    State,
+    EventType,
+    ExecutorKind,
+    MisfirePolicy,
+    OverlapPolicy,
+    SlowConsumerPolicy,
+    WorkerAssignment,
+)
+from .timers import Timer, TimerHeap
+from .workers import WorkerPool
+
+if TYPE_CHECKING:
+    from .profiling import JobProfile
+
+# how many runs of the dependency graphs are kept for the API
+DAG_RUN_HISTORY = 100
+
+# what the API and the saved state leave out of a job
+_UNSERIALIZED_FIELDS = {"definition": {"async_callable", "retry_on"}}
 
 
 class Manager:
-    def __init__(self):
+    def __init__(
+        self,
+        log_capacity: int = 10000,
+        log_subscriber_queue_size: int = 1000,
+        slow_consumer_policy: SlowConsumerPolicy = "lag",
+        state_journal: Optional[StateJournal] = None,
+        max_concurrency: Optional[int] = None,
+        thread_pool_size: Optional[int] = None,
+        process_pool_size: Optional[int] = None,
+        workers: int = 0,
+        worker_assignment: WorkerAssignment = "hash",
+        coordinator: Optional[Coordinator] = None,
+        clock: Optional[Clock] = None,
+        loop_monitor: Optional[LoopMonitor] = None,
+        shutdown_drain_timeout: float = 0.0,
+        shutdown_cancel_timeout: float = 5.0,
+        catch_up_rate: Optional[float] = None,
+        spread: float = 0.0,
+    ):
+        self._clock = clock or Clock()
         self._jobs: dict[str, JobInfo] = {}
-        self._tasks: Dict[str, asyncio.Task] = {}
-        self._log_queue: Deque[JobLog] = deque()
+        self._job_names: List[str] = []
+        # the API representation of the jobs, dropped whenever a job changes
+        self._serialized_jobs: Dict[str, bytes] = {}
+        self._jobs_version: int = 0
+        self._instance_id: str = uuid.uuid4().hex[:8]
+        # the names of the jobs as they change, for generate_job_updates()
+        self._job_broadcaster: Broadcaster[str] = Broadcaster(
+            maxsize=log_subscriber_queue_size, slow_consumer_policy="lag"
+        )
+        self._tasks: Dict[str, List[asyncio.Task]] = {}
+        self._replaced_tasks: Set[asyncio.Task] = set()
+        self._log_store = LogStore(capacity=log_capacity)
+        self._log_broadcaster: Broadcaster[LogRecord] = Broadcaster(
+            maxsize=log_subscriber_queue_size,
+            slow_consumer_policy=slow_consumer_policy,
+        )
+
+        self._timers = TimerHeap()
+        self._job_timers: Dict[str, Timer] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self._concurrency_limiter: Optional[CapacityLimiter] = (
+            CapacityLimiter(max_concurrency) if max_concurrency else None
+        )
+        self._resource_pools: Dict[str, CapacityLimiter] = {}
+        self._waiting_runs = TimerHeap()
+        # missed runs waiting for their turn, not to start them all at once
+        self._catch_up_rate = catch_up_rate
+        self._catch_up_runs = TimerHeap()
+        self._next_catch_up_slot: float = 0.0
+        # how long after each fire time each job starts, so that the jobs sharing
+        # a crontab expression do not all start in the same loop iteration
+        self._spread = spread
+        self._start_offsets: Dict[str, float] = {}
+        self._waiting_counts: Dict[str, int] = {}
+        # the attempt of the next run of the jobs whose next start is a retry
+        self._pending_retries: Dict[str, int] = {}
+        self._executors = Executors(
+            thread_pool_size=thread_pool_size, process_pool_size=process_pool_size
+        )
+        # with workers, asyncio jobs run in worker processes instead of this loop
+        self._worker_pool: Optional[WorkerPool] = (
+            WorkerPool(workers, assignment=worker_assignment) if workers else None
+        )
 
         self._is_running: bool = False
         self._is_shutting_down: bool = False
+        self._shutdown_drain_timeout = shutdown_drain_timeout
+        self._shutdown_cancel_timeout = shutdown_cancel_timeout
+        # set once no job is running anymore, while shutting down
+        self._idle: Optional[asyncio.Event] = None
 
         self._cleanup_tasks: List[asyncio.Task] = []
 
+        self._metrics = Metrics()
+        # when each running task started, for the duration histograms
+        self._task_starts: Dict[asyncio.Task, float] = {}
+        self._task_attempts: Dict[asyncio.Task, int] = {}
+        # when the running tasks of the jobs with a timeout are cancelled
+        self._task_deadlines = TimerHeap()
+        self._task_timeouts: Dict[asyncio.Task, Timer] = {}
+        self._timed_out_tasks: Set[asyncio.Task] = set()
+
+        # the jobs run once all the jobs they depend on finished
+        self._downstream: Dict[str, List[str]] = {}
+        # for each job, the graph runs of its upstream jobs finished so far
+        self._finished_upstreams: Dict[str, Dict[str, List[int]]] = {}
+        self._triggered_runs: List[Tuple[str, Tuple[int, ...]]] = []
+        self._dag_run_ids = itertools.count(1)
+        self._dag_runs: Dict[int, dict] = {}
+        self._task_dag_runs: Dict[asyncio.Task, Tuple[int, ...]] = {}
+
         self._initial_state: Optional[State] = None
+        self._state_journal = state_journal
+        # decides which replica runs each scheduled start
+        self._coordinator = coordinator
+        # also measures the CPU time of the asyncio jobs run in this loop
+        self._loop_monitor = loop_monitor
+        self._profiles: Dict[str, "JobProfile"] = {}
+
+    @property
+    def clock(self) -> Clock:
+        """The clock the jobs should sleep with, when it is a ``VirtualClock``."""
+        return self._clock
 
     def set_default(self):
         set_manager(self)
@@ -34,46 +179,263 @@ class Manager:
     def set_initial_state(self, state: State):
         self._initial_state = state
 
-    async def generate_logs(self, as_json_lines: bool = False):
-        last_index = 0
-        while True:
-            for i in range(last_index, len(self._log_queue)):
-                log = self._log_queue[i]
-                if as_json_lines:
-                    log = f"{log.json()}\n"
-                yield log
-            last_index = len(self._log_queue)
-            await asyncio.sleep(3)
+    def get_logs(
+        self,
+        since: int = 0,
+        job_name: str = None,
+        event_type: EventType = None,
+        limit: int = None,
+    ) -> List[LogRecord]:
+        return self._log_store.query(
+            since=since, job_name=job_name, event_type=event_type, limit=limit
+        )
+
+    def get_evicted_logs(self, since: int) -> Optional[EvictedLogs]:
+        evicted_range = self._log_store.evicted_range(since)
+        if evicted_range is None:
+            return None
+        return EvictedLogs(from_seq=evicted_range[0], to_seq=evicted_range[1])
+
+    async def generate_logs(
+        self,
+        as_json_lines: bool = False,
+        since: int = 0,
+        job_name: str = None,
+        event_type: EventType = None,
+        report_evicted: bool = False,
+    ):
+        """Yield the logs with a sequence number greater than ``since``, then
+        the new ones as soon as they are published.
+
+        A subscriber that falls behind resumes from the log store, unless the
+        manager drops slow consumers, in which case the generator ends. With
+        ``report_evicted``, logs that were evicted from the store before they
+        could be sent are reported with an ``EvictedLogs`` item.
+        """
+        subscription = self._log_broadcaster.subscribe()
+        try:
+            # start by replaying the history
+            subscription.lagging = True
+            while not subscription.dropped:
+                logs: List[Union[LogRecord, EvictedLogs]] = []
+                if subscription.lagging:
+                    subscription.reset()
+                    evicted = self.get_evicted_logs(since)
+                    if evicted and report_evicted:
+                        logs.append(evicted)
+                    logs.extend(self.get_logs(since, job_name, event_type))
+                    since = self._log_store.last_seq
+                else:
+                    log = await subscription.queue.get()
+                    if log.seq <= since:
+                        continue
+                    since = log.seq
+                    if job_name not in (None, log.job_name):
+                        continue
+                    if event_type not in (None, log.event_type):
+                        continue
+                    logs.append(log)
+
+                for log in logs:
+                    if isinstance(log, EvictedLogs):
+                        yield f"{log.json()}\n".encode() if as_json_lines else log
+                    else:
+                        yield log.json_line() if as_json_lines else log.to_job_log()
+        finally:
+            self._log_broadcaster.unsubscribe(subscription)
+
+    async def generate_job_updates(self, job_names: Set[str] = None):
+        """Yield a ``snapshot`` of the jobs, then their ``changes`` as soon as
+        they happen, both as a ``(kind, {job_name: fields})`` pair.
+
+        A change only holds the fields that differ from what was sent before,
+        and changes in quick succession are sent together. ``job_names``
+        restricts the updates to some jobs.
+        """
+
+        def watched(name: str) -> bool:
+            return job_names is None or name in job_names
+
+        subscription = self._job_broadcaster.subscribe()
+        try:
+            sent: Dict[str, dict] = {
+                name: json.loads(self.get_serialized_job(name))
+                for name in self._job_names
+                if watched(name)
+            }
+            yield "snapshot", sent
+
+            while not subscription.dropped:
+                changed_names = {await subscription.queue.get()}
+                while not subscription.queue.empty():
+                    changed_names.add(subscription.queue.get_nowait())
+                if subscription.lagging:
+                    subscription.reset()
+                    changed_names = set(self._job_names)
+
+                changes = {}
+                for name in filter(watched, changed_names):
+                    job = json.loads(self.get_serialized_job(name))
+                    previous = sent.get(name, {})
+                    fields = {
+                        field: value
+                        for field, value in job.items()
+                        if field not in previous or previous[field] != value
+                    }
+                    if fields:
+                        changes[name] = fields
+                        sent[name] = job
+                if changes:
+                    yield "changes", changes
+        finally:
+            self._job_broadcaster.unsubscribe(subscription)
 
     def register(
         self,
-        async_callable: Callable[[], Coroutine],
+        async_callable: Callable[[], Union[Coroutine, Any]],
         crontab: str = None,
         name: str = None,
+        overlap: OverlapPolicy = "skip",
+        max_instances: int = 1,
+        max_queued: int = 1,
+        resource_pool: str = None,
+        executor: ExecutorKind = "asyncio",
+        terminate_on_cancel: bool = False,
+        misfire: MisfirePolicy = "coalesce",
+        misfire_grace_time: Optional[float] = 1.0,
+        misfire_max_runs: int = 10,
+        jitter: float = 0.0,
+        max_attempts: int = 1,
+        retry_backoff: float = 1.0,
+        retry_max_backoff: float = 300.0,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+        timeout: float = None,
+        depends_on: Sequence[str] = (),
     ):
+        """Register a job.
+
+        ``overlap`` decides what happens when a run is due while the job is
+        still running: ``skip`` it, ``queue`` it after the running one,
+        ``replace`` the running one, or run up to ``max_instances`` in
+        ``parallel``. A job in a ``resource_pool`` only runs while the pool has
+        capacity left. At most ``max_queued`` runs of a job wait for their turn,
+        the runs due meanwhile are skipped.
+
+        With the ``thread`` or ``process`` executor, ``async_callable`` is a sync
+        callable run off the event loop; a process job must be picklable. A
+        cancelled thread job is asked to stop through a ``cancel_event`` keyword
+        argument, if it takes one, while a process job is only killed if it was
+        registered with ``terminate_on_cancel``.
+
+        A scheduled run starting more than ``misfire_grace_time`` seconds late,
+        after a downtime or while the loop was blocked, is a misfire. The runs
+        missed since are then skipped with the ``skip`` policy, unless the
+        latest is still within the grace time, merged into a single run with
+        ``coalesce``, or all run with ``all``, up to the ``misfire_max_runs``
+        latest ones, as fast as the manager's ``catch_up_rate`` allows.
+
+        A job with a ``jitter`` starts up to that many seconds after each fire
+        time, by an offset derived from its name, so the same on every replica.
+        Without one, the manager's ``spread`` gives the offsets a window of that
+        fraction of the interval between fire times.
+
+        A run failing with one of the ``retry_on`` exceptions is retried until
+        it ran ``max_attempts`` times, after ``retry_backoff`` seconds doubled on
+        each retry up to ``retry_max_backoff``, and partly randomized. The retry
+        takes the place of the next scheduled start until it succeeds.
+
+        A run lasting more than ``timeout`` seconds is cancelled, and the job is
+        then scheduled as if the run had finished. A process job with a timeout
+        runs in its own process, so that it can be terminated, but a thread job
+        cannot be stopped: it is asked to through its ``cancel_event``, and
+        keeps its slot until it returns.
+
+        A job runs each time all the jobs it ``depends_on`` finished successfully
+        since its previous run, on top of its crontab. The runs a job starts
+        this way, down to the last jobs depending on it, make up a run of its
+        dependency graph.
+        """
         name = name or async_callable.__name__
         if name in self._jobs:
             raise Exception(f"Job <{name}> already exists.")
+        if resource_pool is not None and resource_pool not in self._resource_pools:
+            raise Exception(f"Resource pool <{resource_pool}> does not exist.")
+        # listed twice, an upstream job would trigger the job twice
+        depends_on = list(dict.fromkeys(depends_on))
+        self._check_dependencies(name, depends_on)
 
-        self._jobs[name] = JobInfo(
-            definition=JobDefinition(
-                name=name, async_callable=async_callable, crontab=crontab, enabled=True
-            ),
-            status="registered",
+        definition = JobDefinition(
+            name=name,
+            async_callable=async_callable,
+            crontab=crontab,
+            enabled=True,
+            overlap=overlap,
+            max_instances=max_instances,
+            max_queued=max_queued,
+            resource_pool=resource_pool,
+            executor=executor,
+            terminate_on_cancel=terminate_on_cancel,
+            misfire=misfire,
+            misfire_grace_time=misfire_grace_time,
+            misfire_max_runs=misfire_max_runs,
+            jitter=jitter,
+            max_attempts=max_attempts,
+            retry_backoff=retry_backoff,
+            retry_max_backoff=retry_max_backoff,
+            retry_on=retry_on,
+            timeout=timeout,
+            depends_on=depends_on,
         )
+        # parse the crontab now, so that invalid expressions fail at registration
+        definition.schedule
+        self._start_offsets[name] = self._start_offset(definition)
+        for upstream in depends_on:
+            self._downstream.setdefault(upstream, []).append(name)
+        if depends_on:
+            self._finished_upstreams[name] = {}
+
+        self._jobs[name] = JobInfo(definition=definition, status="registered")
+        self._job_names.append(name)
+        self._metrics.add_job(name)
 
         self._log_event("job_registered", name)
+        self._arm_timer(name, self._clock.time())
+        self._touch(name)
 
-    def _log_event(self, event_type: EventType, job_name: str, error: str = None):
-        self._log_queue.append(
-            JobLog(
-                event_type=event_type,
-                job_name=job_name,
-                crontab=self._jobs[job_name].definition.crontab,
-                enabled=self._jobs[job_name].definition.enabled,
-                error=error,
-            )
+    def _check_dependencies(self, name: str, depends_on: Sequence[str]) -> None:
+        """Raise if ``name`` would depend on itself through ``depends_on``."""
+        seen: Set[str] = set()
+        stack = list(depends_on)
+        while stack:
+            upstream = stack.pop()
+            if upstream == name:
+                raise Exception(f"Job <{name}> would depend on itself.")
+            if upstream not in seen and upstream in self._jobs:
+                seen.add(upstream)
+                stack.extend(self._jobs[upstream].definition.depends_on)
+
+    def add_resource_pool(self, name: str, size: int) -> None:
+        """Create a named pool allowing at most ``size`` of its jobs to run at once."""
+        if name in self._resource_pools:
+            raise Exception(f"Resource pool <{name}> already exists.")
+        self._resource_pools[name] = CapacityLimiter(size)
+
+    def _log_event(
+        self,
+        event_type: EventType,
+        job_name: str,
+        error: str = None,
+        attempt: int = None,
+    ):
+        log = LogRecord(
+            timestamp=self._clock.time(),
+            event_type=event_type,
+            definition=self._jobs[job_name].definition,
+            error=error,
+            attempt=attempt,
         )
+        self._log_store.append(log)
+        self._log_broadcaster.publish(log)
 
     def _get_job(self, name: str) -> JobInfo:
         try:
@@ -81,7 +443,7 @@ class Manager:
         except KeyError as e:
             raise JobNotFoundException from e
 
-    def _get_task(self, name: str) -> asyncio.Task:
+    def _get_tasks(self, name: str) -> List[asyncio.Task]:
         try:
             return self._tasks[name]
         except KeyError as e:
@@ -90,75 +452,561 @@ class Manager:
     def _is_job_running(self, name: str) -> bool:
         return name in self._tasks
 
+    def _limiters(self, definition: JobDefinition) -> List[CapacityLimiter]:
+        limiters = []
+        if self._concurrency_limiter is not None:
+            limiters.append(self._concurrency_limiter)
+        if definition.resource_pool is not None:
+            limiters.append(self._resource_pools[definition.resource_pool])
+        return limiters
+
+    def _has_capacity(self, definition: JobDefinition) -> bool:
+        return all(limiter.has_capacity() for limiter in self._limiters(definition))
+
+    def _has_free_instance(self, definition: JobDefinition, queued: bool) -> bool:
+        instances = len(self._tasks.get(definition.name, ()))
+        if queued:
+            instances += self._waiting_counts.get(definition.name, 0)
+        if definition.overlap == "parallel":
+            return instances < definition.max_instances
+        return instances < 1
+
     def get_job_info(self, name: str) -> JobInfo:
         return self._get_job(name)
 
     def _get_job_status(self, name: str) -> JobStatus:
         return self._get_job(name).status
 
-    def _get_job_next_start_in(self, name: str) -> Optional[int]:
-        job = self._get_job(name)
-        if job.definition.crontab is None:
+    def _start_offset(self, definition: JobDefinition) -> float:
+        if definition.schedule is None:
+            return 0.0
+        window = definition.jitter
+        if not window and self._spread:
+            window = self._spread * definition.schedule.shortest_interval
+        return start_offset(definition.name, window)
+
+    def _get_job_next_start(self, name: str) -> Optional[float]:
+        schedule = self._get_job(name).definition.schedule
+        if schedule is None:
             return None
-        return CronTab(job.definition.crontab).next(default_utc=True)
+        now = self._clock.time()
+        offset = self._start_offsets[name]
+        fire_time = schedule.next_after(now - offset)
+        if fire_time + offset <= now:
+            # the start just due, back from the offset with a rounding error
+            fire_time = schedule.next_after(fire_time)
+        return fire_time + offset
+
+    def get_job_upcoming_starts(self, name: str, count: int = 10) -> List[float]:
+        """The next ``count`` starts of a job, up to ``SCHEDULE_WINDOW_SIZE``."""
+        schedule = self._get_job(name).definition.schedule
+        if schedule is None:
+            return []
+        offset = self._start_offsets[name]
+        # each fire time takes some crontab work in the loop, and stays in memory
+        count = min(count, SCHEDULE_WINDOW_SIZE)
+        return [
+            fire_time + offset
+            for fire_time in schedule.upcoming(self._clock.time() - offset, count)
+        ]
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _arm_timer(self, name: str, deadline: float) -> None:
+        self._disarm_timer(name)
+        self._job_timers[name] = self._timers.push(deadline, name)
+        self._wake()
+
+    def _disarm_timer(self, name: str) -> None:
+        timer = self._job_timers.pop(name, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _set_next_start(self, name: str, next_start: Optional[float]) -> None:
+        self._get_job(name).next_start = next_start
+        if next_start is None:
+            self._disarm_timer(name)
+        else:
+            self._arm_timer(name, next_start)
+        self._touch(name)
 
     async def _create_task(self, definition: JobDefinition) -> asyncio.Task:
-        task = asyncio.create_task(definition.async_callable(), name=definition.name)
+        if definition.executor == "asyncio" and self._worker_pool is not None:
+            coroutine = self._worker_pool.run(definition)
+        elif definition.executor == "asyncio":
+            coroutine = definition.async_callable()
+            profile = self._profiles.get(definition.name)
+            if profile is not None and not profile.is_complete:
+                coroutine = profile.wrap(coroutine)
+            if self._loop_monitor is not None:
+                coroutine = TimedCoroutine(coroutine)
+        else:
+            coroutine = self._executors.run(definition)
+        task = asyncio.create_task(coroutine, name=definition.name)
         task.add_done_callback(functools.partial(self._on_job_done, definition.name))
         return task
 
+    def profile_job(self, name: str, runs: int = 1) -> None:
+        """Profile the next ``runs`` runs of a job, dropping any previous profile."""
+        definition = self._get_job(name).definition
+        if definition.executor != "asyncio" or self._worker_pool is not None:
+            raise JobNotProfilableException
+        # the profilers are only imported when needed
+        from .profiling import JobProfile
+
+        self._profiles[name] = JobProfile(runs)
+
+    def get_job_profile(self, name: str) -> Optional["JobProfile"]:
+        """The profile of a job, once a profiled run has started."""
+        self._get_job(name)
+        profile = self._profiles.get(name)
+        if profile is None or not profile.has_results:
+            return None
+        return profile
+
     async def cancel_job(self, name: str):
-        logger.info(f"Cancelling {name}")
+        logger.info("Cancelling %s", name, extra={"job": name})
         self._get_job(name)
-        self._get_task(name).cancel()
+        for task in self._get_tasks(name):
+            task.cancel()
 
     async def start_job(self, name: str) -> None:
-        if self._is_job_running(name):
+        job = self._get_job(name)
+        if not self._has_free_instance(job.definition, queued=True):
             raise JobAlreadyRunningException
 
+        if self._pending_retries.pop(name, None) is not None:
+            # started by hand, the retry is not needed anymore
+            self._set_next_start(name, self._get_job_next_start(name))
+        if self._has_capacity(job.definition):
+            await self._start_instance(name)
+        else:
+            self._enqueue_run(name, self._clock.time())
+
+    async def _request_run(
+        self,
+        name: str,
+        deadline: float,
+        attempt: int = 1,
+        dag_runs: Tuple[int, ...] = (),
+    ) -> None:
+        """Start a scheduled run, unless the overlap policy or the concurrency
+        limits say otherwise."""
+        definition = self._get_job(name).definition
+
+        if not self._has_free_instance(definition, queued=True):
+            if definition.overlap == "replace":
+                for task in self._tasks.get(name, ()):
+                    self._replaced_tasks.add(task)
+                    task.cancel()
+                if self._waiting_counts.get(name):
+                    self._skip_in_dag_runs(dag_runs, name)
+                    return
+            elif definition.overlap != "queue":
+                self._log_event("job_skipped", name)
+                self._skip_in_dag_runs(dag_runs, name)
+                return
+        elif self._has_capacity(definition):
+            await self._start_instance(name, deadline, attempt, dag_runs)
+            return
+
+        # a job slower than its schedule would otherwise queue a run on every tick
+        if self._waiting_counts.get(name, 0) >= definition.max_queued:
+            self._log_event("job_skipped", name)
+            self._skip_in_dag_runs(dag_runs, name)
+            return
+        self._enqueue_run(name, deadline, attempt, dag_runs)
+
+    def _enqueue_run(
+        self,
+        name: str,
+        deadline: float,
+        attempt: int = 1,
+        dag_runs: Tuple[int, ...] = (),
+    ) -> None:
+        self._waiting_runs.push(deadline, (deadline, name, attempt, dag_runs))
+        self._waiting_counts[name] = self._waiting_counts.get(name, 0) + 1
+        self._log_event("job_queued", name)
+
+        job = self._get_job(name)
+        if not self._is_job_running(name):
+            job.status = "queued"
+            self._touch(name)
+
+    async def _dispatch_waiting_runs(self) -> None:
+        """Start the queued runs that can run now, earliest deadline first."""
+        for deadline, name, attempt, dag_runs in self._waiting_runs.pop_due(
+            float("inf")
+        ):
+            definition = self._get_job(name).definition
+            if (
+                not self._is_shutting_down
+                and self._has_free_instance(definition, queued=False)
+                and self._has_capacity(definition)
+            ):
+                self._waiting_counts[name] -= 1
+                await self._start_instance(name, deadline, attempt, dag_runs)
+            else:
+                self._waiting_runs.push(deadline, (deadline, name, attempt, dag_runs))
+
+    async def _start_instance(
+        self,
+        name: str,
+        deadline: float = None,
+        attempt: int = 1,
+        dag_runs: Tuple[int, ...] = (),
+    ) -> None:
+        """Start a run; ``deadline`` is when it was due, if it was scheduled, and
+        ``dag_runs`` the runs of the dependency graphs it is part of."""
         job = self._get_job(name)
-        await self._on_job_started(name)
-        self._tasks[name] = await self._create_task(job.definition)
+        for limiter in self._limiters(job.definition):
+            limiter.acquire()
+
+        await self._on_job_started(name, attempt)
+        task = await self._create_task(job.definition)
+        self._tasks.setdefault(name, []).append(task)
+        started_at = self._clock.time()
+        self._task_starts[task] = started_at
+        self._task_attempts[task] = attempt
+        if job.definition.timeout is not None:
+            self._task_timeouts[task] = self._task_deadlines.push(
+                started_at + job.definition.timeout, task
+            )
+            self._wake()
+        job.attempt = attempt
+        if not dag_runs and self._downstream.get(name):
+            dag_runs = (self._start_dag_run(name),)
+        if dag_runs:
+            self._task_dag_runs[task] = dag_runs
+            self._set_dag_run_status(dag_runs, name, "running")
+        # the next start is set again below, taking the place of any retry
+        self._pending_retries.pop(name, None)
+        if deadline is not None:
+            self._metrics.jobs[name].lag.observe(max(started_at - deadline, 0))
         job.status = "running"
-        job.next_start = now().timestamp() + (self._get_job_next_start_in(name) or 0)
+        job.last_start = self._clock.now()
+        self._set_next_start(name, self._get_job_next_start(name))
+        self._journal_job(job)
 
     def get_jobs_info(self) -> List[JobInfo]:
         return list(self._jobs.values())
 
+    @property
+    def jobs_version(self) -> str:
+        """Changes whenever a job is registered or changes."""
+        return f"{self._instance_id}-{self._jobs_version}"
+
+    def _touch(self, name: str) -> None:
+        self._serialized_jobs.pop(name, None)
+        self._jobs_version += 1
+        self._job_broadcaster.publish(name)
+
+    def get_serialized_job(self, name: str) -> bytes:
+        """The job info as JSON, serialized again only after the job changed."""
+        serialized = self._serialized_jobs.get(name)
+        if serialized is None:
+            job = self._get_job(name)
+            serialized = json.dumps(
+                job.dict(exclude=_UNSERIALIZED_FIELDS),
+                default=pydantic_encoder,
+                separators=(",", ":"),
+            ).encode()
+            self._serialized_jobs[name] = serialized
+        return serialized
+
+    def get_serialized_jobs(
+        self,
+        cursor: int = 0,
+        limit: int = None,
+        status: JobStatus = None,
+        name_prefix: str = None,
+    ) -> Tuple[List[bytes], Optional[int]]:
+        """A page of the jobs as JSON, in registration order.
+
+        The page starts at the ``cursor``-th job; it is returned with the cursor
+        of the next page, or ``None`` once there are no more jobs to look at.
+        """
+        page = []
+        for index in range(cursor, len(self._job_names)):
+            name = self._job_names[index]
+            if name_prefix is not None and not name.startswith(name_prefix):
+                continue
+            if status is not None and self._jobs[name].status != status:
+                continue
+            page.append(self.get_serialized_job(name))
+            if len(page) == limit:
+                next_cursor = index + 1
+                return page, next_cursor if next_cursor < len(self._job_names) else None
+        return page, None
+
     def _on_job_done(self, job_name: str, task: asyncio.Task) -> None:
         job = self._get_job(job_name)
-        del self._tasks[job_name]
+        self._tasks[job_name].remove(task)
+        if not self._tasks[job_name]:
+            del self._tasks[job_name]
+        for limiter in self._limiters(job.definition):
+            limiter.release()
+        replaced = task in self._replaced_tasks
+        self._replaced_tasks.discard(task)
+        job.last_finish = self._clock.now()
+        metrics = self._metrics.jobs[job_name]
+        metrics.duration.observe(self._clock.time() - self._task_starts.pop(task))
+        attempt = self._task_attempts.pop(task)
+        timeout = self._task_timeouts.pop(task, None)
+        if timeout is not None:
+            timeout.cancel()
+        timed_out = task in self._timed_out_tasks
+        self._timed_out_tasks.discard(task)
+        dag_runs = self._task_dag_runs.pop(task, ())
+        # a retry still pending is superseded by the outcome of this run
+        self._pending_retries.pop(job_name, None)
+        coroutine = task.get_coro()
+        if isinstance(coroutine, TimedCoroutine):
+            job.last_cpu_time = coroutine.cpu_time
 
-        if task.cancelled():
-            self._log_event("job_cancelled", job.definition.name)
-            job.status = "cancelled"
-            job.next_start = None
+        status: JobStatus
+        if task.cancelled() and timed_out:
+            self._log_event("job_timed_out", job_name, attempt=attempt)
+            status = "timed_out"
+            if not self._is_job_running(job_name):
+                self._set_next_start(job_name, self._get_job_next_start(job_name))
+
+            task = asyncio.create_task(self.on_job_timed_out(job_name))
+            self._cleanup_tasks.append(task)
+
+        elif task.cancelled():
+            self._log_event("job_cancelled", job_name, attempt=attempt)
+            status = "cancelled"
+            if not replaced:
+                self._set_next_start(job_name, None)
 
             task = asyncio.create_task(self.on_job_cancelled(job_name))
             self._cleanup_tasks.append(task)
 
         elif exception := task.exception():
-            self._log_event("job_failed", job.definition.name, error=str(exception))
-            job.status = "failed"
-            job.next_start = None
+            self._log_event(
+                "job_failed", job_name, error=str(exception), attempt=attempt
+            )
+            status = "failed"
+            self._set_next_start(job_name, self._retry_at(job, attempt, exception))
 
             task = asyncio.create_task(self.on_job_exception(job_name, exception))
             self._cleanup_tasks.append(task)
 
         else:
-            self._log_event("job_finished", job.definition.name)
-            job.status = "finished"
-            job.next_start = (
-                now().timestamp() + self._get_job_next_start_in(job_name)
-                if job.definition.crontab
-                else None
-            )
+            self._log_event("job_finished", job_name, attempt=attempt)
+            status = "finished"
+            if not self._is_job_running(job_name):
+                self._set_next_start(job_name, self._get_job_next_start(job_name))
 
             task = asyncio.create_task(self.on_job_finished(job_name))
             self._cleanup_tasks.append(task)
 
-    async def _on_job_started(self, job_name: str):
-        self._log_event("job_started", job_name)
+        job.last_finish_status = status
+        metrics.runs[status] += 1
+        self._set_dag_run_status(dag_runs, job_name, status)
+        self._trigger_downstream(job_name, status == "finished", dag_runs)
+        if self._is_job_running(job_name):
+            job.status = "running"
+        elif self._waiting_counts.get(job_name):
+            job.status = "queued"
+        else:
+            job.status = status
+        self._touch(job_name)
+        self._journal_job(job)
+
+        if self._waiting_runs:
+            self._wake()
+        if self._idle is not None and not self._tasks:
+            self._idle.set()
+
+    def _trigger_downstream(
+        self, name: str, succeeded: bool, dag_runs: Tuple[int, ...]
+    ) -> None:
+        """Start the jobs whose upstream jobs all finished, now that ``name`` did.
+
+        A job waiting for several upstream jobs runs as part of the graph runs
+        of all of them.
+        """
+        for downstream in self._downstream.get(name, ()):
+            finished = self._finished_upstreams[downstream]
+            if not succeeded:
+                # an earlier success of ``name`` does not count anymore
+                superseded = finished.pop(name, [])
+                self._skip_in_dag_runs((*superseded, *dag_runs), downstream)
+                continue
+
+            # the graph runs dropped from the history are not tracked anymore
+            finished[name] = [
+                run_id
+                for run_id in (*finished.get(name, ()), *dag_runs)
+                if run_id in self._dag_runs
+            ]
+            if finished.keys() >= set(self._jobs[downstream].definition.depends_on):
+                triggered_by = tuple(
+                    dict.fromkeys(run for runs in finished.values() for run in runs)
+                )
+                finished.clear()
+                self._triggered_runs.append((downstream, triggered_by))
+                self._wake()
+
+    def _skip_in_dag_runs(self, dag_runs: Tuple[int, ...], name: str) -> None:
+        """Record that ``name`` and the jobs below it do not run in ``dag_runs``."""
+        for run_id in dag_runs:
+            dag_run = self._dag_runs.get(run_id)
+            if dag_run is None:
+                continue
+            stack = [name]
+            while stack:
+                job_name = stack.pop()
+                if dag_run["jobs"].get(job_name) == "pending":
+                    dag_run["jobs"][job_name] = "skipped"
+                    stack.extend(self._downstream.get(job_name, ()))
+
+    def _start_dag_run(self, name: str) -> int:
+        """Record a new run of the dependency graph below ``name``."""
+        jobs = {}
+        stack = list(self._downstream[name])
+        while stack:
+            downstream = stack.pop()
+            if downstream not in jobs:
+                jobs[downstream] = "pending"
+                stack.extend(self._downstream.get(downstream, ()))
+
+        run_id = next(self._dag_run_ids)
+        self._dag_runs[run_id] = {
+            "id": run_id,
+            "started_at": self._clock.time(),
+            "jobs": {name: "running", **jobs},
+        }
+        if len(self._dag_runs) > DAG_RUN_HISTORY:
+            del self._dag_runs[next(iter(self._dag_runs))]
+        return run_id
+
+    def _set_dag_run_status(
+        self, dag_runs: Tuple[int, ...], name: str, status: JobStatus
+    ) -> None:
+        for run_id in dag_runs:
+            dag_run = self._dag_runs.get(run_id)
+            if dag_run is not None:
+                dag_run["jobs"][name] = status
+
+    def get_dag(self) -> Dict[str, dict]:
+        """The jobs depending on other jobs or depended on, with their edges."""
+        return {
+            name: {
+                "depends_on": self._jobs[name].definition.depends_on,
+                "downstream": self._downstream.get(name, []),
+            }
+            for name in self._job_names
+            if self._jobs[name].definition.depends_on or self._downstream.get(name)
+        }
+
+    def get_dag_run(self, run_id: int) -> Optional[dict]:
+        """A run of a dependency graph, with the status of each of its jobs.
+
+        The run is ``failed`` as soon as one of its jobs did not finish
+        successfully, and ``finished`` once all of them finished or were
+        ``skipped``, because a run of theirs was skipped or an upstream job
+        failed before they ran.
+        """
+        dag_run = self._dag_runs.get(run_id)
+        if dag_run is None:
+            return None
+        statuses = set(dag_run["jobs"].values())
+        if statuses & {"failed", "cancelled", "timed_out"}:
+            status = "failed"
+        elif statuses <= {"finished", "skipped"}:
+            status = "finished"
+        else:
+            status = "running"
+        return {**dag_run, "jobs": dict(dag_run["jobs"]), "status": status}
+
+    def get_dag_runs(self, limit: int = 10) -> List[dict]:
+        """The latest runs of the dependency graphs, newest first."""
+        run_ids = list(self._dag_runs)[::-1][:limit]
+        return [self.get_dag_run(run_id) for run_id in run_ids]
+
+    def get_metrics(self) -> str:
+        """The metrics of the manager and its jobs, in the Prometheus text format."""
+        return self._metrics.render(
+            [
+                (
+                    "aiocronjob_running_tasks",
+                    "Job runs in progress.",
+                    len(self._task_starts),
+                ),
+                (
+                    "aiocronjob_queued_runs",
+                    "Runs waiting for an instance or for capacity.",
+                    len(self._waiting_runs),
+                ),
+                (
+                    "aiocronjob_log_buffer_size",
+                    "Logs held in the log store.",
+                    len(self._log_store),
+                ),
+                (
+                    "aiocronjob_log_subscribers",
+                    "Consumers of the log stream.",
+                    len(self._log_broadcaster),
+                ),
+            ]
+        )
+
+    def get_loop_stats(self) -> Optional[dict]:
+        """The event loop lag and the latest stalls, if the loop is monitored."""
+        if self._loop_monitor is None:
+            return None
+        return self._loop_monitor.stats()
+
+    def _on_loop_stall(self, task: Optional[asyncio.Task], duration: float) -> None:
+        # the job's task may be done already, but it is named after the job
+        job = self._jobs.get(task.get_name()) if task is not None else None
+        if job is not None:
+            job.loop_stalls = (job.loop_stalls or 0) + 1
+            job.loop_stall_time = (job.loop_stall_time or 0) + duration
+            self._touch(job.definition.name)
+
+    def _journal_job(self, job: JobInfo) -> None:
+        if self._state_journal is not None:
+            self._state_journal.append(
+                job.definition.name,
+                {field: getattr(job, field) for field in JobState.__fields__},
+            )
+
+    def _retry_at(
+        self, job: JobInfo, attempt: int, exception: BaseException
+    ) -> Optional[float]:
+        """When to retry a failed run, if it should be retried at all."""
+        definition = job.definition
+        if (
+            self._is_shutting_down
+            or attempt >= definition.max_attempts
+            or not isinstance(exception, definition.retry_on)
+        ):
+            return None
+
+        backoff = min(
+            definition.retry_backoff * 2 ** (attempt - 1), definition.retry_max_backoff
+        )
+        # half of it is random, so that jobs failing together do not retry together
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        self._pending_retries[definition.name] = attempt + 1
+        self._log_event("job_retrying", definition.name, attempt=attempt + 1)
+        logger.info(
+            "[JOB_RETRYING] job=%s, attempt=%s, delay=%.3f",
+            definition.name,
+            attempt + 1,
+            delay,
+            extra={"job": definition.name},
+        )
+        return self._clock.time() + delay
+
+    async def _on_job_started(self, job_name: str, attempt: int = 1):
+        self._log_event("job_started", job_name, attempt=attempt)
         await self.on_job_started(job_name)
 
     async def run(self):
@@ -169,71 +1017,254 @@ class Manager:
         self._is_running = True
         await self.on_startup()
 
+        if self._worker_pool is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._worker_pool.start, loop)
+
+        if self._coordinator is not None:
+            await self._coordinator.start()
+
+        if self._loop_monitor is not None:
+            self._loop_monitor.start(on_stall=self._on_loop_stall)
+
         if self._initial_state:
-            for job_info in self._initial_state.jobs_info:
-                try:
-                    job = self._get_job(job_info.get("definition", {}).get("name"))
-                except Exception:
-                    continue
-                job.status = job_info.get("status") or job.status
-                job.last_status = job_info.get("last_status") or job.last_status
-                job.created_at = job_info.get("created_at") or job.created_at
-                job.last_finish = job_info.get("last_finish") or job.last_finish
+            self._restore_state(self._initial_state)
+
+        if self._state_journal is not None:
+            loop = asyncio.get_running_loop()
+            self._restore_state(
+                await loop.run_in_executor(None, self._state_journal.load)
+            )
+            self._state_journal.start()
+
+        for job_name, job in self._jobs.items():
+            if job.status in ["running", "queued"] and not self._is_job_running(
+                job_name
+            ):
+                await self.start_job(job_name)
 
         await self._run_ad_infinitum()
 
-    async def _run_ad_infinitum(self):
-        while True and self._is_running:
-            for job_name, job in self._jobs.items():
-                this_time_ts = now().timestamp()
-
-                if job.status == "registered":
-                    delta: int = self._get_job_next_start_in(job_name) or 0
-                    job.status = "pending"
-                    job.next_start = now().timestamp() + delta
-                elif (
-                    not self._is_shutting_down
-                    and job.status in ["pending", "finished"]
-                    and job.next_start is not None
-                    and job.next_start <= this_time_ts
+    def _restore_state(self, state: State) -> None:
+        for job_info in state.jobs_info:
+            job = self._jobs.get(job_info.get("definition", {}).get("name"))
+            if job is None:
+                continue
+
+            job_state = JobState.parse_obj(job_info)
+            for field, value in job_state:
+                if value is not None:
+                    setattr(job, field, value)
+            self._touch(job.definition.name)
+
+            if (
+                job.status in ["pending", "finished", "timed_out"]
+                and job.next_start is not None
+            ):
+                self._arm_timer(job.definition.name, job.next_start)
+
+    async def _on_timer(self, job_name: str) -> None:
+        self._job_timers.pop(job_name, None)
+        job = self._get_job(job_name)
+
+        if job.status == "registered":
+            job.status = "pending"
+            next_start = self._get_job_next_start(job_name)
+            if next_start is None and not job.definition.depends_on:
+                # started once now, unless it waits for the jobs it depends on
+                next_start = self._clock.time()
+            self._set_next_start(job_name, next_start)
+        elif (
+            not self._is_shutting_down
+            and job.status
+            in ["pending", "finished", "running", "queued", "failed", "timed_out"]
+            and job.next_start is not None
+        ):
+            deadline = job.next_start
+            attempt = self._pending_retries.pop(job_name, 1)
+            self._set_next_start(job_name, self._get_job_next_start(job_name))
+            if job.definition.schedule is None or attempt > 1:
+                await self._request_run(job_name, deadline, attempt)
+                return
+
+            missed = self._resolve_misfire(job.definition, deadline)
+            for fire_time in [deadline] if missed is None else missed:
+                if self._coordinator is not None and not await self._coordinator.claim(
+                    job_name, fire_time
                 ):
-                    await self.start_job(job_name)
-                elif job.status == "running" and not self._is_job_running(job_name):
-                    await self.start_job(job_name)
-                else:  # job.status in ["cancelled", "failed"]:
-                    ...
-            await asyncio.sleep(1.5)
-
-    async def shutdown(self):
-        await asyncio.sleep(2)
+                    logger.debug("Start of %s claimed by another replica", job_name)
+                elif missed is None:
+                    await self._request_run(job_name, fire_time)
+                else:
+                    await self._catch_up(job_name, fire_time)
+
+    def _resolve_misfire(
+        self, definition: JobDefinition, deadline: float
+    ) -> Optional[List[float]]:
+        """The missed fire times to catch up with, according to the misfire
+        policy, if the timer due at ``deadline`` is later than the grace time."""
+        now = self._clock.time()
+        grace_time = definition.misfire_grace_time
+        if grace_time is None or now - deadline <= grace_time:
+            return None
+
+        self._log_event("job_misfired", definition.name)
+        offset = self._start_offsets[definition.name]
+        # fire times are whole seconds, the rounding undoes the offset exactly
+        since = round(deadline - offset, 3)
+        count = definition.misfire_max_runs if definition.misfire == "all" else 1
+        missed = [
+            fire_time + offset
+            for fire_time in definition.schedule.recent(now - offset, count, since)
+        ]
+        # none, if the restored start was not a fire time of the schedule anymore
+        if not missed or (
+            definition.misfire == "skip" and now - missed[-1] > grace_time
+        ):
+            return []
+        return missed
+
+    async def _catch_up(self, name: str, fire_time: float) -> None:
+        """Run a missed fire time, at most ``catch_up_rate`` runs per second."""
+        if self._catch_up_rate is None:
+            await self._request_run(name, fire_time)
+            return
+
+        now = self._clock.time()
+        slot = max(now, self._next_catch_up_slot)
+        self._next_catch_up_slot = slot + 1 / self._catch_up_rate
+        if slot <= now:
+            await self._request_run(name, fire_time)
+        else:
+            self._catch_up_runs.push(slot, (name, fire_time))
+            self._wake()
+
+    async def _run_ad_infinitum(self):
+        """Sleep until the earliest job deadline, or until woken by a new timer."""
+        self._wakeup = asyncio.Event()
+        while self._is_running:
+            self._wakeup.clear()
+
+            for job_name in self._timers.pop_due(self._clock.time()):
+                await self._on_timer(job_name)
+
+            for job_name, fire_time in self._catch_up_runs.pop_due(self._clock.time()):
+                if not self._is_shutting_down:
+                    await self._request_run(job_name, fire_time)
+
+            triggered_runs, self._triggered_runs = self._triggered_runs, []
+            for job_name, dag_runs in triggered_runs:
+                if self._is_shutting_down:
+                    self._skip_in_dag_runs(dag_runs, job_name)
+                else:
+                    await self._request_run(
+                        job_name, self._clock.time(), dag_runs=dag_runs
+                    )
+
+            for task in self._task_deadlines.pop_due(self._clock.time()):
+                del self._task_timeouts[task]
+                self._timed_out_tasks.add(task)
+                task.cancel()
+
+            if self._waiting_runs:
+                await self._dispatch_waiting_runs()
+
+            next_deadline = min(
+                (
+                    deadline
+                    for deadline in (
+                        self._timers.next_deadline(),
+                        self._catch_up_runs.next_deadline(),
+                        self._task_deadlines.next_deadline(),
+                    )
+                    if deadline is not None
+                ),
+                default=None,
+            )
+            timeout = (
+                None
+                if next_deadline is None
+                else max(next_deadline - self._clock.time(), 0)
+            )
+            await self._clock.wait(self._wakeup, timeout)
+
+    async def _wait_until_idle(self, timeout: float) -> bool:
+        """Wait at most ``timeout`` seconds for the running jobs to end."""
+        if self._tasks:
+            self._idle = asyncio.Event()
+            try:
+                await self._clock.wait(self._idle, timeout)
+            finally:
+                self._idle = None
+        return not self._tasks
+
+    async def shutdown(self, drain_timeout: float = None):
+        """Stop scheduling runs, let the running jobs finish for ``drain_timeout``
+        seconds, which defaults to the manager's ``shutdown_drain_timeout``,
+        then cancel all those still running at once and flush the state.
+
+        Cancelled jobs are waited for at most ``shutdown_cancel_timeout`` seconds,
+        so a shutdown takes little more than the sum of both timeouts.
+        """
+        if drain_timeout is None:
+            drain_timeout = self._shutdown_drain_timeout
         logger.info("Shutting down...")
-        logger.info(f"Cancelling {len(self._tasks)} running jobs...")
         self._is_shutting_down = True
 
-        for running_job in self._tasks.values():
-            task_name = running_job.get_name()
-            await self.cancel_job(task_name)
-            logger.debug(f"Cancelled job {task_name}")
+        if self._tasks and drain_timeout > 0:
+            logger.info(f"Waiting for {len(self._tasks)} running jobs to finish...")
+            await self._wait_until_idle(drain_timeout)
+
+        logger.info(f"Cancelling {len(self._tasks)} running jobs...")
+        for tasks in self._tasks.values():
+            for task in tasks:
+                task.cancel()
+        stopped = await self._wait_until_idle(self._shutdown_cancel_timeout)
+        if not stopped:
+            logger.warning(f"{len(self._tasks)} jobs did not stop when cancelled.")
 
         await asyncio.gather(*self._cleanup_tasks)
         logger.debug("Cleanup tasks finished.")
 
+        loop = asyncio.get_running_loop()
+        # the threads of jobs that did not stop are left behind
+        await loop.run_in_executor(
+            None, functools.partial(self._executors.shutdown, wait=stopped)
+        )
+        if self._worker_pool is not None:
+            await loop.run_in_executor(None, self._worker_pool.stop)
+        if self._coordinator is not None:
+            await self._coordinator.stop()
+        if self._loop_monitor is not None:
+            self._loop_monitor.stop()
+        if self._state_journal is not None:
+            await loop.run_in_executor(None, self._state_journal.close)
+
         await self.on_shutdown()
 
         self._is_running = False
         self._is_shutting_down = False
+        self._wake()
 
     async def on_job_started(self, job_name: str):
-        logger.info(f"[JOB_STARTED] job=%s", job_name)
+        logger.info("[JOB_STARTED] job=%s", job_name, extra={"job": job_name})
 
     async def on_job_exception(self, job_name: str, exception: BaseException):
-        logger.error("[JOB_EXCEPTION] job=%s, exc_msg=%s", job_name, str(exception))
+        logger.error(
+            "[JOB_EXCEPTION] job=%s, exc_msg=%s",
+            job_name,
+            str(exception),
+            extra={"job": job_name},
+        )
 
     async def on_job_cancelled(self, job_name: str):
-        logger.info(f"[JOB_CANCELLED] job=%s", job_name)
+        logger.info("[JOB_CANCELLED] job=%s", job_name, extra={"job": job_name})
+
+    async def on_job_timed_out(self, job_name: str) -> None:
+        logger.warning("[JOB_TIMED_OUT] job=%s", job_name, extra={"job": job_name})
 
     async def on_job_finished(self, job_name: str) -> None:
-        logger.info(f"[JOB_FINISHED] job=%s", job_name)
+        logger.info("[JOB_FINISHED] job=%s", job_name, extra={"job": job_name})
 
     async def on_startup(self) -> None:
         logger.info("[STARTING]")
@@ -243,9 +1274,9 @@ class Manager:
 
     def state(self) -> State:
         state = State(
-            created_at=now(),
+            created_at=self._clock.now(),
             jobs_info=[
-                job.dict(exclude={"definition": {"async_callable"}})
+                job.dict(exclude=_UNSERIALIZED_FIELDS)
                 for job in self.get_jobs_info()
             ]
         )
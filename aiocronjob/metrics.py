@@ -0,0 +1,95 @@
+import bisect
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60)
+OUTCOMES = ("finished", "failed", "cancelled", "timed_out")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        # the last one counts the values above every bucket
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bucket}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.sum}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class JobMetrics:
+    __slots__ = ("labels", "runs", "duration", "lag")
+
+    def __init__(self, job_name: str):
+        self.labels = f'job="{_escape(job_name)}"'
+        self.runs: Dict[str, int] = dict.fromkeys(OUTCOMES, 0)
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.lag = Histogram(LAG_BUCKETS)
+
+
+class Metrics:
+    """Counters updated as the jobs run, rendered in the Prometheus text format
+    without looking at the jobs themselves."""
+
+    def __init__(self):
+        self.jobs: Dict[str, JobMetrics] = {}
+
+    def add_job(self, job_name: str) -> None:
+        self.jobs[job_name] = JobMetrics(job_name)
+
+    def render(self, gauges: Sequence[Tuple[str, str, float]]) -> str:
+        """The metrics of the jobs, followed by ``(name, help, value)`` gauges."""
+        lines = [
+            "# HELP aiocronjob_job_runs_total Finished job runs, by outcome.",
+            "# TYPE aiocronjob_job_runs_total counter",
+        ]
+        for job in self.jobs.values():
+            for outcome, count in job.runs.items():
+                lines.append(
+                    f'aiocronjob_job_runs_total{{{job.labels},outcome="{outcome}"}}'
+                    f" {count}"
+                )
+
+        for name, help_text, attribute in (
+            (
+                "aiocronjob_job_run_duration_seconds",
+                "Duration of the job runs.",
+                "duration",
+            ),
+            (
+                "aiocronjob_job_scheduling_lag_seconds",
+                "Delay between the scheduled and the actual start of a run.",
+                "lag",
+            ),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for job in self.jobs.values():
+                lines.extend(getattr(job, attribute).samples(name, job.labels))
+
+        for name, help_text, value in gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
@@ -1,22 +1,93 @@
 import datetime
-from typing import Literal, Coroutine, Callable, Optional
+from typing import (
+    Any,
+    Literal,
+    Coroutine,
+    Callable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
+
+from .schedule import Schedule, compile_schedule
 
 JobStatus = Literal[
-    "registered", "running", "finished", "pending", "cancelled", "failed"
+    "registered",
+    "running",
+    "finished",
+    "pending",
+    "cancelled",
+    "failed",
+    "queued",
+    "timed_out",
 ]
 
 EventType = Literal[
-    "job_registered", "job_started", "job_failed", "job_finished", "job_cancelled"
+    "job_registered",
+    "job_started",
+    "job_failed",
+    "job_finished",
+    "job_cancelled",
+    "job_skipped",
+    "job_queued",
+    "job_misfired",
+    "job_retrying",
+    "job_timed_out",
 ]
 
+OverlapPolicy = Literal["skip", "queue", "replace", "parallel"]
+
+MisfirePolicy = Literal["skip", "coalesce", "all"]
+
+ExecutorKind = Literal["asyncio", "thread", "process"]
+
+WorkerAssignment = Literal["hash", "least_loaded"]
+
+CoordinationMode = Literal["claim", "leader"]
+
+SlowConsumerPolicy = Literal["drop", "lag"]
+
+LogDropPolicy = Literal["drop_new", "drop_oldest", "block"]
+
+LogFormat = Literal["text", "kv", "json"]
+
 
 class JobDefinition(BaseModel):
     name: str
-    async_callable: Callable[[], Coroutine]
+    # a sync callable, for the "thread" and "process" executors
+    async_callable: Callable[[], Union[Coroutine, Any]]
     enabled: bool = True
     crontab: Optional[str] = None
+    overlap: OverlapPolicy = "skip"
+    max_instances: int = 1
+    max_queued: int = 1
+    resource_pool: Optional[str] = None
+    executor: ExecutorKind = "asyncio"
+    terminate_on_cancel: bool = False
+    misfire: MisfirePolicy = "coalesce"
+    misfire_grace_time: Optional[float] = 1.0
+    misfire_max_runs: int = 10
+    # how late after each fire time the job may start, at most
+    jitter: float = 0.0
+    max_attempts: int = 1
+    retry_backoff: float = 1.0
+    retry_max_backoff: float = 300.0
+    # not part of the API output
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+    timeout: Optional[float] = None
+    depends_on: List[str] = []
+
+    _schedule: Optional[Schedule] = PrivateAttr(default=None)
+
+    @property
+    def schedule(self) -> Optional[Schedule]:
+        if self._schedule is None and self.crontab is not None:
+            self._schedule = compile_schedule(self.crontab)
+        return self._schedule
 
 
 class JobInfo(BaseModel):
@@ -28,17 +99,45 @@ class JobInfo(BaseModel):
     last_finish_status: JobStatus = None
     next_start: datetime.datetime = None
     status: JobStatus
+    # only measured with a loop monitor
+    last_cpu_time: float = None
+    loop_stalls: int = None
+    loop_stall_time: float = None
+    # of the last run started, counting from 1
+    attempt: int = None
+
+
+class JobState(BaseModel):
+    """The part of a ``JobInfo`` that is restored from a saved state."""
+
+    status: JobStatus = None
+    created_at: datetime.datetime = None
+    last_status: JobStatus = None
+    last_start: datetime.datetime = None
+    last_finish: datetime.datetime = None
+    last_finish_status: JobStatus = None
+    next_start: float = None
 
 
 class JobLog(BaseModel):
+    seq: int = None
     event_type: EventType
     job_name: str
     crontab: str = None
     enabled: bool
     error: str = None
+    attempt: int = None
     timestamp: int = Field(default_factory=lambda: datetime.datetime.now().timestamp())
 
 
+class EvictedLogs(BaseModel):
+    """Marks a range of logs no longer available in the log store."""
+
+    event_type: Literal["logs_evicted"] = "logs_evicted"
+    from_seq: int
+    to_seq: int
+
+
 class State(BaseModel):
     created_at: datetime.datetime
     jobs_info: list[dict]
@@ -0,0 +1,143 @@
+import asyncio
+import collections
+import threading
+import time
+from typing import Any, Callable, Deque, Optional
+
+from .logger import logger
+
+
+class WrappedCoroutine(collections.abc.Coroutine):
+    """Wraps a coroutine to run ``_before_step`` and ``_after_step`` around each
+    of its steps, whether it is run by a task or awaited."""
+
+    __slots__ = ("_coro",)
+
+    def __init__(self, coro: collections.abc.Coroutine):
+        self._coro = coro
+
+    def _before_step(self) -> None:
+        pass
+
+    def _after_step(self) -> None:
+        pass
+
+    def send(self, value: Any) -> Any:
+        self._before_step()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._after_step()
+
+    def throw(self, *args) -> Any:
+        self._before_step()
+        try:
+            return self._coro.throw(*args)
+        finally:
+            self._after_step()
+
+    def close(self) -> None:
+        self._coro.close()
+
+    @property
+    def __name__(self) -> str:
+        return getattr(self._coro, "__name__", type(self._coro).__name__)
+
+    def __next__(self) -> Any:
+        return self.send(None)
+
+    def __await__(self):
+        return self
+
+
+class TimedCoroutine(WrappedCoroutine):
+    """Wraps a coroutine to add up the CPU time spent in each of its steps."""
+
+    __slots__ = ("cpu_time", "_step_start")
+
+    def __init__(self, coro: collections.abc.Coroutine):
+        super().__init__(coro)
+        self.cpu_time: float = 0.0
+        self._step_start: float = 0.0
+
+    def _before_step(self) -> None:
+        self._step_start = time.thread_time()
+
+    def _after_step(self) -> None:
+        self.cpu_time += time.thread_time() - self._step_start
+
+
+class LoopMonitor:
+    """Measures the event loop lag, and blames stalls on the task running.
+
+    A heartbeat task sleeps ``interval`` seconds at a time and measures how late
+    it wakes up. A watchdog thread notices when the heartbeat is more than
+    ``threshold`` seconds late and records the task the loop is stuck in, so
+    that a stall can be attributed even though the loop cannot run any code.
+    """
+
+    def __init__(
+        self, interval: float = 0.05, threshold: float = 0.1, history: int = 100
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.last_lag: float = 0.0
+        self.max_lag: float = 0.0
+        self.stalls: Deque[dict] = collections.deque(maxlen=history)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._on_stall: Optional[Callable[[asyncio.Task, float], None]] = None
+        self._deadline: float = float("inf")
+        self._culprit: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    def start(self, on_stall: Callable[[Optional[asyncio.Task], float], None]):
+        """Start monitoring the running loop; ``on_stall`` gets the task blamed
+        for each stall, if any, and its duration."""
+        self._loop = asyncio.get_running_loop()
+        self._on_stall = on_stall
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.create_task(self._beat_forever())
+        threading.Thread(
+            target=self._watch, name="aiocronjob-loop-monitor", daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _beat_forever(self) -> None:
+        while True:
+            self._deadline = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - self._deadline, 0.0)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+
+            culprit, self._culprit = self._culprit, None
+            if lag >= self.threshold:
+                name = culprit.get_name() if culprit is not None else None
+                logger.warning("[LOOP_STALL] task=%s, duration=%.3f", name, lag)
+                self.stalls.append(
+                    {"task_name": name, "duration": lag, "timestamp": time.time()}
+                )
+                self._on_stall(culprit, lag)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if (
+                self._culprit is None
+                and time.monotonic() - self._deadline > self.threshold
+            ):
+                # reading the current task of another thread's loop is safe
+                self._culprit = asyncio.current_task(self._loop)
+
+    def stats(self) -> dict:
+        return {
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "stalls": list(self.stalls),
+        }
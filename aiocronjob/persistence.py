@@ -0,0 +1,123 @@
+import json
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+from pydantic.json import pydantic_encoder
+
+from .models import State
+from .util import now
+
+_STOP = object()
+
+
+class StateJournal:
+    """Crash-safe store of the jobs' state.
+
+    Every status transition is appended as one JSON line to a journal file by a
+    background thread, so the event loop never waits for the disk. Once the
+    journal holds ``compact_every`` records, the merged state is written to a
+    snapshot file and the journal starts over. Loading reads the snapshot and
+    replays the journal on top of it; a record torn by a crash is dropped.
+    """
+
+    def __init__(self, path: str, compact_every: int = 1000):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.compact_every = compact_every
+
+        self._jobs: Dict[str, dict] = {}
+        self._journal_size: int = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self) -> State:
+        self._jobs = {}
+        self._journal_size = 0
+
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path) as f:
+                self._jobs = json.load(f)
+
+        if os.path.exists(self.path):
+            valid_size = 0
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break
+                    self._merge(record)
+                    self._journal_size += 1
+                    valid_size += len(line)
+            # cut a torn record off, or the next records would be appended to it
+            if valid_size < os.path.getsize(self.path):
+                os.truncate(self.path, valid_size)
+
+        return State(
+            created_at=now(),
+            jobs_info=[
+                {"definition": {"name": name}, **fields}
+                for name, fields in self._jobs.items()
+            ],
+        )
+
+    def _merge(self, record: dict) -> None:
+        record = dict(record)
+        self._jobs.setdefault(record.pop("name"), {}).update(record)
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._write_forever, name="aiocronjob-journal", daemon=True
+            )
+            self._thread.start()
+
+    def append(self, name: str, fields: dict) -> None:
+        """Queue a record for the writer thread; it never blocks."""
+        self._queue.put({"name": name, **fields})
+
+    def close(self) -> None:
+        """Write the queued records and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def compact(self) -> None:
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._jobs, f, default=pydantic_encoder)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # the snapshot is already durable, so losing the journal now is harmless
+        with open(self.path, "w"):
+            pass
+        self._journal_size = 0
+
+    def _write_forever(self) -> None:
+        stop = False
+        while not stop:
+            records = [self._queue.get()]
+            while not self._queue.empty():
+                records.append(self._queue.get())
+            stop = _STOP in records
+            records = [record for record in records if record is not _STOP]
+            if not records:
+                continue
+
+            with open(self.path, "a") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=pydantic_encoder) + "\n")
+                    self._merge(record)
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_size += len(records)
+
+            if self._journal_size >= self.compact_every:
+                self.compact()
@@ -0,0 +1,59 @@
+import collections
+import cProfile
+import io
+import marshal
+import pstats
+
+from .monitor import WrappedCoroutine
+
+
+class ProfiledCoroutine(WrappedCoroutine):
+    """Wraps a coroutine to profile each of its steps, and nothing in between."""
+
+    __slots__ = ("_profiler",)
+
+    def __init__(self, coro: collections.abc.Coroutine, profiler: cProfile.Profile):
+        super().__init__(coro)
+        self._profiler = profiler
+
+    def _before_step(self) -> None:
+        self._profiler.enable()
+
+    def _after_step(self) -> None:
+        self._profiler.disable()
+
+
+class JobProfile:
+    """The profile of the next ``runs`` runs of a job, aggregated."""
+
+    def __init__(self, runs: int):
+        self.runs = runs
+        self.runs_started: int = 0
+        self._profiler = cProfile.Profile()
+
+    def wrap(self, coroutine: collections.abc.Coroutine) -> ProfiledCoroutine:
+        self.runs_started += 1
+        return ProfiledCoroutine(coroutine, self._profiler)
+
+    @property
+    def is_complete(self) -> bool:
+        return self.runs_started >= self.runs
+
+    @property
+    def has_results(self) -> bool:
+        """Whether a profiled run already took at least a step."""
+        return bool(self._profiler.getstats())
+
+    def _stats(self) -> pstats.Stats:
+        return pstats.Stats(self._profiler)
+
+    def as_text(self, sort: str = "cumulative", limit: int = 50) -> str:
+        stream = io.StringIO()
+        stats = self._stats()
+        stats.stream = stream
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def as_pstats(self) -> bytes:
+        """The content of a ``.prof`` file, as written by ``Stats.dump_stats``."""
+        return marshal.dumps(self._stats().stats)
@@ -0,0 +1,130 @@
+import bisect
+import datetime
+import functools
+import zlib
+from typing import List
+
+import pytz
+from crontab import CronTab
+
+SCHEDULE_CACHE_SIZE = 1024
+# how many fire times a schedule keeps, including some already past
+SCHEDULE_WINDOW_SIZE = 64
+# the interval of a schedule is measured from a fixed time, over a year or that
+# many fire times, so that it only depends on the expression
+INTERVAL_REFERENCE_TIME = datetime.datetime(2001, 1, 1, tzinfo=pytz.utc).timestamp()
+INTERVAL_PERIOD = 365 * 24 * 3600
+INTERVAL_MAX_FIRE_TIMES = 100
+
+
+class Schedule:
+    """A crontab expression parsed once, with a lazily extended window of the
+    upcoming fire times."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self._crontab = CronTab(expression)
+        self._window_start: float = float("inf")
+        self._window: List[float] = []
+
+    def _next_after(self, timestamp: float) -> float:
+        return self._crontab.next(
+            now=datetime.datetime.fromtimestamp(timestamp, tz=pytz.utc),
+            delta=False,
+            default_utc=True,
+        )
+
+    def _extend_window(self, timestamp: float, count: int) -> int:
+        """Make the window hold the ``count`` fire times following ``timestamp``
+        and return the index of the first one.
+
+        The window holds every fire time after ``_window_start``, so that jobs
+        looking at it from slightly different times, like those with a start
+        offset, share it instead of rebuilding it in turn.
+        """
+        if timestamp < self._window_start:
+            earlier: List[float] = []
+            if self._window:
+                fire_time = self._next_after(timestamp)
+                while fire_time < self._window[0] and len(earlier) < count:
+                    earlier.append(fire_time)
+                    fire_time = self._next_after(fire_time)
+                if fire_time < self._window[0]:
+                    # too far back to join the window, which starts over
+                    self._window = []
+            self._window[:0] = earlier
+            self._window_start = timestamp
+
+        index = bisect.bisect_right(self._window, timestamp)
+        if index == len(self._window):
+            # past the whole window, which starts over from the timestamp
+            self._window = []
+            self._window_start = timestamp
+            index = 0
+        while len(self._window) - index < count:
+            last = self._window[-1] if self._window else timestamp
+            self._window.append(self._next_after(last))
+
+        # fire times already in the past are not needed anymore
+        dropped = min(len(self._window) - SCHEDULE_WINDOW_SIZE, index)
+        if dropped > 0:
+            self._window_start = self._window[dropped - 1]
+            del self._window[:dropped]
+            index -= dropped
+        return index
+
+    def next_after(self, timestamp: float) -> float:
+        """Timestamp of the first fire time strictly after ``timestamp``."""
+        return self.upcoming(timestamp, 1)[0]
+
+    def upcoming(self, timestamp: float, count: int) -> List[float]:
+        """Timestamps of the next ``count`` fire times after ``timestamp``."""
+        index = self._extend_window(timestamp, count)
+        return self._window[index : index + count]
+
+    def recent(self, timestamp: float, count: int, since: float) -> List[float]:
+        """Timestamps of the last ``count`` fire times from ``since`` up to
+        ``timestamp`` included, oldest first."""
+        fire_times: List[float] = []
+        # the crontab's previous fire time is strictly before the given time
+        timestamp += 0.001
+        while len(fire_times) < count:
+            timestamp = self._crontab.previous(
+                now=datetime.datetime.fromtimestamp(timestamp, tz=pytz.utc),
+                delta=False,
+                default_utc=True,
+            )
+            if timestamp is None or timestamp < since:
+                break
+            fire_times.append(timestamp)
+        return fire_times[::-1]
+
+    @functools.cached_property
+    def shortest_interval(self) -> float:
+        """Shortest time between two consecutive fire times, or 0 if it never
+        fires twice."""
+        shortest = 0.0
+        end = INTERVAL_REFERENCE_TIME + INTERVAL_PERIOD
+        fire_time = self._next_after(INTERVAL_REFERENCE_TIME)
+        for _ in range(INTERVAL_MAX_FIRE_TIMES):
+            if fire_time is None or (fire_time > end and shortest):
+                break
+            next_fire_time = self._next_after(fire_time)
+            if next_fire_time is None:
+                break
+            interval = next_fire_time - fire_time
+            shortest = min(shortest, interval) if shortest else interval
+            fire_time = next_fire_time
+        return shortest
+
+
+@functools.lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def compile_schedule(expression: str) -> Schedule:
+    """Return the shared compiled schedule for a crontab expression."""
+    return Schedule(expression)
+
+
+def start_offset(name: str, window: float) -> float:
+    """A stable offset in ``[0, window)`` for the job ``name``, the same in every
+    process, unlike ``hash()``."""
+    return zlib.crc32(name.encode()) / 2**32 * window
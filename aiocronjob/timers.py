@@ -0,0 +1,52 @@
+import heapq
+import itertools
+from typing import Any, List, Optional
+
+
+class Timer:
+    __slots__ = ("deadline", "seq", "item", "cancelled")
+
+    def __init__(self, deadline: float, seq: int, item: Any):
+        self.deadline = deadline
+        self.seq = seq
+        self.item = item
+        self.cancelled = False
+
+    def __lt__(self, other: "Timer") -> bool:
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerHeap:
+    """Min-heap of timers keyed on their deadline.
+
+    Cancelled timers are dropped lazily when they reach the top of the heap, so
+    both scheduling and cancelling are cheap regardless of the number of timers.
+    """
+
+    def __init__(self):
+        self._heap: List[Timer] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, deadline: float, item: Any) -> Timer:
+        timer = Timer(deadline, next(self._seq), item)
+        heapq.heappush(self._heap, timer)
+        return timer
+
+    def next_deadline(self) -> Optional[float]:
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+        return self._heap[0].deadline if self._heap else None
+
+    def pop_due(self, timestamp: float) -> List[Any]:
+        due = []
+        while self._heap and self._heap[0].deadline <= timestamp:
+            timer = heapq.heappop(self._heap)
+            if not timer.cancelled:
+                due.append(timer.item)
+        return due
@@ -0,0 +1,227 @@
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import threading
+import time
+import zlib
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+from .logger import logger
+from .models import JobDefinition, WorkerAssignment
+
+_mp_context = multiprocessing.get_context("spawn")
+
+
+def _read_forever(conn, on_message: Callable[[tuple], None]) -> None:
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            on_message(("eof",))
+            return
+        on_message(message)
+
+
+def _report(conn, run_id: int, task: asyncio.Task) -> None:
+    if task.cancelled():
+        conn.send(("cancelled", run_id))
+    elif task.exception() is not None:
+        exception = task.exception()
+        try:
+            conn.send(("done", run_id, exception))
+        except Exception:
+            # the exception could not be pickled
+            conn.send(("done", run_id, RuntimeError(repr(exception))))
+    else:
+        conn.send(("done", run_id, None))
+
+
+async def _serve(conn) -> None:
+    loop = asyncio.get_running_loop()
+    inbox: "asyncio.Queue[tuple]" = asyncio.Queue()
+    threading.Thread(
+        target=_read_forever,
+        args=(conn, functools.partial(loop.call_soon_threadsafe, inbox.put_nowait)),
+        daemon=True,
+    ).start()
+
+    callables: Dict[str, Callable[[], Coroutine]] = {}
+    tasks: Dict[int, asyncio.Task] = {}
+    while True:
+        message = await inbox.get()
+        if message[0] == "run":
+            _, run_id, name, async_callable = message
+            if async_callable is not None:
+                callables[name] = async_callable
+            try:
+                task = asyncio.create_task(callables[name](), name=name)
+            except Exception as e:
+                conn.send(("done", run_id, e))
+                continue
+            task.add_done_callback(functools.partial(_report, conn, run_id))
+            task.add_done_callback(lambda _, run_id=run_id: tasks.pop(run_id))
+            tasks[run_id] = task
+        elif message[0] == "cancel":
+            if message[1] in tasks:
+                tasks[message[1]].cancel()
+        else:  # "stop" or "eof"
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            return
+
+
+def _worker_main(conn) -> None:
+    asyncio.run(_serve(conn))
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.load: int = 0
+        self.known_jobs: Set[str] = set()
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self, on_message: Callable[[int, Any, tuple], None]) -> None:
+        self.conn, child_conn = _mp_context.Pipe()
+        self.process = _mp_context.Process(
+            target=_worker_main,
+            args=(child_conn,),
+            name=f"aiocronjob-worker-{self.index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.known_jobs = set()
+        threading.Thread(
+            target=_read_forever,
+            args=(self.conn, functools.partial(on_message, self.index, self.conn)),
+            daemon=True,
+        ).start()
+
+    def request_stop(self) -> None:
+        if self.alive:
+            try:
+                self.conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+
+    def join(self, timeout: float) -> None:
+        if self.process is not None:
+            self.process.join(timeout=timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.process = None
+
+
+class WorkerPool:
+    """Runs ``asyncio`` jobs in worker processes, each with its own event loop.
+
+    A job always goes to the same worker with the ``hash`` assignment, chosen by
+    rendezvous hashing of its name, or to the worker with the fewest runs in
+    flight with ``least_loaded``. Results, exceptions and cancellations travel
+    back over pipes, and cancelling ``run()`` cancels the run in the worker.
+    The jobs' callables must be picklable.
+    """
+
+    def __init__(self, size: int, assignment: WorkerAssignment = "hash"):
+        if size < 1:
+            raise ValueError("A worker pool needs at least 1 worker.")
+        self.assignment = assignment
+        self._workers = [_Worker(index) for index in range(size)]
+        self._run_ids = itertools.count()
+        self._runs: Dict[int, Tuple[_Worker, asyncio.Future]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start the workers not running yet; ``loop`` receives their messages."""
+        self._loop = loop
+        for worker in self._workers:
+            if not worker.alive:
+                worker.start(self._on_message_threadsafe)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop all the workers together, terminating those still running
+        after ``timeout`` seconds."""
+        for worker in self._workers:
+            worker.request_stop()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(deadline - time.monotonic(), 0))
+
+    def loads(self) -> List[int]:
+        return [worker.load for worker in self._workers]
+
+    def _assign(self, name: str) -> _Worker:
+        if self.assignment == "least_loaded":
+            return min(self._workers, key=lambda worker: worker.load)
+        return max(
+            self._workers,
+            key=lambda worker: zlib.crc32(f"{worker.index}:{name}".encode()),
+        )
+
+    def _on_message_threadsafe(self, index: int, conn, message: tuple) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._on_message, index, conn, message)
+        except RuntimeError:
+            # the event loop is already closed
+            pass
+
+    def _on_message(self, index: int, conn, message: tuple) -> None:
+        if message[0] == "eof":
+            if self._workers[index].conn is not conn:
+                # a previous process of a restarted worker
+                return
+            for worker, future in self._runs.values():
+                if worker.index == index and not future.done():
+                    future.set_exception(RuntimeError("Worker process died."))
+            return
+
+        worker, future = self._runs.get(message[1], (None, None))
+        if future is None or future.done():
+            return
+        if message[0] == "cancelled":
+            future.cancel()
+        elif message[2] is not None:
+            future.set_exception(message[2])
+        else:
+            future.set_result(None)
+
+    async def run(self, definition: JobDefinition) -> Any:
+        worker = self._assign(definition.name)
+        if not worker.alive:
+            logger.debug("Starting worker %s", worker.index)
+            self._loop = asyncio.get_running_loop()
+            worker.start(self._on_message_threadsafe)
+
+        run_id = next(self._run_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._runs[run_id] = worker, future
+        worker.load += 1
+
+        try:
+            if definition.name in worker.known_jobs:
+                worker.conn.send(("run", run_id, definition.name, None))
+            else:
+                worker.conn.send(
+                    ("run", run_id, definition.name, definition.async_callable)
+                )
+                worker.known_jobs.add(definition.name)
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.done():
+                worker.conn.send(("cancel", run_id))
+                await asyncio.wait([future])
+            raise
+        finally:
+            worker.load -= 1
+            del self._runs[run_id]
@@ -0,0 +1,62 @@
+"""Import time and cold start of the scheduler core and of the web layer.
+
+    python -m benchmarks.bench_import [repeat]
+
+Every measure runs in a fresh interpreter, as a CLI or a worker process would,
+and the median of ``repeat`` runs is printed as JSON, in seconds.
+"""
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORTS = {
+    "import_core": "import aiocronjob",
+    "import_manager": "from aiocronjob.manager import Manager",
+    "import_web": "from aiocronjob import create_app",
+}
+
+COLD_START = """
+import asyncio
+from aiocronjob import Manager
+
+async def main():
+    manager = Manager()
+    done = asyncio.Event()
+
+    async def job():
+        done.set()
+
+    manager.register(job)
+    task = asyncio.create_task(manager.run())
+    await done.wait()
+    task.cancel()
+
+asyncio.run(main())
+"""
+
+
+def _run(code: str) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code], check=True, stderr=subprocess.DEVNULL
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    baseline = statistics.median(_run("pass") for _ in range(repeat))
+    results = {"interpreter": baseline}
+    for name, code in IMPORTS.items():
+        results[name] = statistics.median(_run(code) for _ in range(repeat)) - baseline
+    # until the first job ran
+    results["cold_start_first_run"] = (
+        statistics.median(_run(COLD_START) for _ in range(repeat)) - baseline
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compares the memory and streaming cost of ``LogRecord`` with the pydantic
+``JobLog`` it replaced in the log store.
+
+    python -m benchmarks.bench_logs [events] [consumers]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from aiocronjob.log_store import LogRecord
+from aiocronjob.models import JobDefinition, JobLog
+from aiocronjob.util import now
+
+
+async def _job():
+    ...
+
+
+def _build_job_logs(definition: JobDefinition, events: int) -> list:
+    return [
+        JobLog(
+            seq=seq,
+            event_type="job_finished",
+            job_name=definition.name,
+            crontab=definition.crontab,
+            enabled=definition.enabled,
+        )
+        for seq in range(events)
+    ]
+
+
+def _build_log_records(definition: JobDefinition, events: int) -> list:
+    return [
+        LogRecord(now().timestamp(), "job_finished", definition)
+        for _ in range(events)
+    ]
+
+
+def _measure(build, stream, definition: JobDefinition, events: int, consumers: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    logs = build(definition, events)
+    build_time = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(consumers):
+        for log in logs:
+            stream(log)
+    stream_time = time.perf_counter() - start
+
+    return {
+        "bytes_per_event": memory / events,
+        "build_us_per_event": build_time / events * 1e6,
+        "stream_us_per_line": stream_time / (events * consumers) * 1e6,
+    }
+
+
+def main(events: int = 10000, consumers: int = 10) -> dict:
+    definition = JobDefinition(
+        name="benchmark-job", async_callable=_job, crontab="*/5 * * * *"
+    )
+    return {
+        "events": events,
+        "consumers": consumers,
+        "job_log": _measure(
+            _build_job_logs,
+            lambda log: f"{log.json()}\n",
+            definition,
+            events,
+            consumers,
+        ),
+        "log_record": _measure(
+            _build_log_records,
+            LogRecord.json_line,
+            definition,
+            events,
+            consumers,
+        ),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(main(*map(int, sys.argv[1:])), indent=2))
@@ -0,0 +1,237 @@
+"""Scheduling benchmarks for the real ``Manager``.
+
+    python -m benchmarks.run [--jobs 2000] [--subscribers 100] [--duration 5]
+                             [--output results.json] [--compare baseline.json]
+
+Prints the results as JSON, and optionally writes them to a file, so that runs
+of different versions can be compared with ``--compare``.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+import httpx
+from async_asgi_testclient import TestClient
+
+from aiocronjob import Manager
+from aiocronjob.logger import logger
+from aiocronjob.main import app
+
+EVERY_SECOND = "* * * * * * *"
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    if len(values) == 1:
+        values = values * 2
+    quantiles = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": quantiles[49],
+        "p90": quantiles[89],
+        "p99": quantiles[98],
+        "max": max(values),
+    }
+
+
+async def _noop():
+    ...
+
+
+def bench_register(jobs: int) -> dict:
+    manager = Manager()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for i in range(jobs):
+        manager.register(_noop, crontab=EVERY_SECOND, name=f"job-{i}")
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # a registered job also holds one log record, measured on its own below
+    return {
+        "us_per_register": elapsed / jobs * 1e6,
+        "bytes_per_job": memory / jobs,
+    }
+
+
+def bench_log_records(events: int) -> dict:
+    manager = Manager(log_capacity=events + 1)
+    manager.register(_noop)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(events):
+        manager._log_event("job_finished", "_noop")
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "us_per_event": elapsed / events * 1e6,
+        "bytes_per_event": memory / events,
+    }
+
+
+async def bench_firing(jobs: int, duration: float) -> dict:
+    """Runs ``jobs`` jobs firing every second; their lateness is measured from
+    the whole second they were due at to their first step.
+
+    All the due jobs are dispatched before any of them runs, so the dispatch
+    rate is measured from the deadline to the first step of the last job.
+    """
+    starts: List[float] = []
+
+    async def job():
+        starts.append(time.time())
+
+    manager = Manager(log_capacity=jobs * 4)
+    for i in range(jobs):
+        manager.register(job, crontab=EVERY_SECOND, name=f"job-{i}")
+
+    manager_task = asyncio.create_task(manager.run())
+    await asyncio.sleep(duration)
+    await manager.shutdown()
+    await manager_task
+
+    # the first second only registers the jobs
+    first_tick = math.floor(min(starts)) if starts else 0
+    lateness = [t - math.floor(t) for t in starts if t >= first_tick + 1]
+    ticks: Dict[int, List[float]] = {}
+    for t in starts:
+        ticks.setdefault(math.floor(t), []).append(t)
+    dispatch_times = [
+        max(times) - tick
+        for tick, times in ticks.items()
+        if tick > first_tick and len(times) == jobs
+    ]
+    dispatch_time = statistics.median(dispatch_times) if dispatch_times else None
+    return {
+        "starts": len(starts),
+        "lateness_s": _percentiles(lateness),
+        "dispatch_s": _percentiles(dispatch_times),
+        "jobs_dispatched_per_s": jobs / dispatch_time if dispatch_time else None,
+    }
+
+
+async def bench_under_load(jobs: int, subscribers: int, duration: float) -> dict:
+    """Latency of /api/jobs, and from publishing a log to its delivery by
+    /api/log-stream to every subscriber, while ``jobs`` jobs fire every second."""
+    manager = Manager(log_capacity=jobs * 4)
+    manager.set_default()
+    for i in range(jobs):
+        manager.register(_noop, crontab=EVERY_SECOND, name=f"job-{i}")
+    manager_task = asyncio.create_task(manager.run())
+
+    deliveries: List[float] = []
+    since = manager.get_logs()[-1].seq
+    streams = []
+
+    async def subscribe() -> None:
+        response = await TestClient(app).get(
+            f"/api/log-stream?since={since}", stream=True
+        )
+        streams.append(response)
+        buffer = b""
+        async for chunk in response.iter_content(chunk_size=65536):
+            received_at = time.time()
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                deliveries.append(received_at - json.loads(line)["timestamp"])
+
+    subscriber_tasks = [asyncio.create_task(subscribe()) for _ in range(subscribers)]
+    latencies = []
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            response = await client.get("/api/jobs")
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+            await asyncio.sleep(0.05)
+
+    for response in streams:
+        response.send({"type": "http.disconnect"})
+    for task in subscriber_tasks:
+        task.cancel()
+    await asyncio.gather(*subscriber_tasks, return_exceptions=True)
+    await manager.shutdown()
+    await manager_task
+    return {
+        "jobs_latency_s": _percentiles(latencies),
+        "delivery_latency_s": _percentiles(deliveries),
+        "deliveries": len(deliveries),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+            "jobs": args.jobs,
+            "subscribers": args.subscribers,
+            "duration": args.duration,
+        },
+        "register": bench_register(args.jobs),
+        "log_records": bench_log_records(args.jobs * 10),
+        "firing": await bench_firing(args.jobs, args.duration),
+        "under_load": await bench_under_load(
+            args.jobs, args.subscribers, args.duration
+        ),
+    }
+
+
+def _flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict) -> Dict[str, float]:
+    """Ratio of every metric to its baseline value."""
+    current, previous = _flatten(results), _flatten(baseline)
+    return {
+        key: current[key] / previous[key]
+        for key in current
+        if not key.startswith("meta.") and previous.get(key)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--subscribers", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    logger.setLevel("WARNING")
+    results = asyncio.run(run(args))
+    if args.compare:
+        with open(args.compare) as f:
+            results["compared_to_baseline"] = compare(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
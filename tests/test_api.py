@@ -1,12 +1,15 @@
 import asyncio
 import datetime
 import json
+import marshal
+import subprocess
+import sys
 from unittest import mock, IsolatedAsyncioTestCase
 
 import httpx
 from async_asgi_testclient import TestClient
 from aiocronjob import Manager, State
-from aiocronjob.main import app, init, shutdown, _main_task
+from aiocronjob.main import app, create_app, init, shutdown, _main_task
 
 
 class TestApi(IsolatedAsyncioTestCase):
@@ -30,18 +33,88 @@ class TestApi(IsolatedAsyncioTestCase):
         response = await self.client.get("/api/jobs/task1")
 
         desired_output = {
-            "definition": {"crontab": None, "enabled": True, "name": "task1"},
+            "definition": {
+                "crontab": None,
+                "enabled": True,
+                "name": "task1",
+                "overlap": "skip",
+                "max_instances": 1,
+                "max_queued": 1,
+                "resource_pool": None,
+                "executor": "asyncio",
+                "terminate_on_cancel": False,
+                "misfire": "coalesce",
+                "misfire_grace_time": 1.0,
+                "misfire_max_runs": 10,
+                "jitter": 0.0,
+                "max_attempts": 1,
+                "retry_backoff": 1.0,
+                "retry_max_backoff": 300.0,
+                "timeout": None,
+                "depends_on": [],
+            },
             "last_finish": None,
             "last_finish_status": None,
             "last_start": None,
             "last_status": None,
             "next_start": None,
             "status": "registered",
+            "last_cpu_time": None,
+            "loop_stalls": None,
+            "loop_stall_time": None,
+            "attempt": None,
             "created_at": mock.ANY,
         }
 
         self.assertEqual(desired_output, response.json())
 
+    async def test_get_job_upcoming_starts(self):
+        async def task1():
+            ...
+
+        self.manager.register(task1, crontab="0 * * * *")
+
+        response = await self.client.get("/api/jobs/task1/upcoming?count=2")
+
+        first, second = response.json()
+        self.assertEqual(0, first % 3600)
+        self.assertEqual(3600, second - first)
+
+        response = await self.client.get("/api/jobs/task1/upcoming?count=50000")
+        self.assertEqual(64, len(response.json()))
+        response = await self.client.get("/api/jobs/task1/upcoming?count=0")
+        self.assertEqual(400, response.status_code)
+
+    async def test_get_job_logs(self):
+        async def task1():
+            ...
+
+        async def task2():
+            ...
+
+        self.manager.register(task1)
+        self.manager.register(task2)
+        await self.manager.start_job("task2")
+        await asyncio.sleep(0.01)
+
+        response = await self.client.get("/api/jobs/task2/logs?limit=2")
+
+        body = response.json()
+        self.assertEqual(
+            ["job_registered", "job_started"],
+            [log["event_type"] for log in body["logs"]],
+        )
+        self.assertEqual(3, body["next_since"])
+        self.assertIsNone(body["evicted"])
+
+        response = await self.client.get(
+            "/api/jobs/task2/logs?since=3&event_type=job_finished"
+        )
+
+        self.assertEqual(
+            ["job_finished"], [log["event_type"] for log in response.json()["logs"]]
+        )
+
     async def test_get_non_existing_job_returns_404(self):
         response = await self.client.get("/api/jobs/non_existing_job")
 
@@ -145,23 +218,69 @@ class TestApi(IsolatedAsyncioTestCase):
 
         desired_output = [
             {
-                "definition": {"crontab": None, "enabled": True, "name": "task1"},
+                "definition": {
+                    "crontab": None,
+                    "enabled": True,
+                    "name": "task1",
+                    "overlap": "skip",
+                    "max_instances": 1,
+                    "max_queued": 1,
+                    "resource_pool": None,
+                    "executor": "asyncio",
+                    "terminate_on_cancel": False,
+                    "misfire": "coalesce",
+                    "misfire_grace_time": 1.0,
+                    "misfire_max_runs": 10,
+                    "jitter": 0.0,
+                    "max_attempts": 1,
+                    "retry_backoff": 1.0,
+                    "retry_max_backoff": 300.0,
+                    "timeout": None,
+                    "depends_on": [],
+                },
                 "last_finish": None,
                 "last_finish_status": None,
                 "last_start": None,
                 "last_status": None,
                 "next_start": None,
                 "status": "registered",
+                "last_cpu_time": None,
+                "loop_stalls": None,
+                "loop_stall_time": None,
+                "attempt": None,
                 "created_at": mock.ANY,
             },
             {
-                "definition": {"crontab": None, "enabled": True, "name": "task2"},
+                "definition": {
+                    "crontab": None,
+                    "enabled": True,
+                    "name": "task2",
+                    "overlap": "skip",
+                    "max_instances": 1,
+                    "max_queued": 1,
+                    "resource_pool": None,
+                    "executor": "asyncio",
+                    "terminate_on_cancel": False,
+                    "misfire": "coalesce",
+                    "misfire_grace_time": 1.0,
+                    "misfire_max_runs": 10,
+                    "jitter": 0.0,
+                    "max_attempts": 1,
+                    "retry_backoff": 1.0,
+                    "retry_max_backoff": 300.0,
+                    "timeout": None,
+                    "depends_on": [],
+                },
                 "last_finish": None,
                 "last_finish_status": None,
                 "last_start": None,
                 "last_status": None,
                 "next_start": None,
                 "status": "registered",
+                "last_cpu_time": None,
+                "loop_stalls": None,
+                "loop_stall_time": None,
+                "attempt": None,
                 "created_at": mock.ANY,
             },
         ]
@@ -186,13 +305,214 @@ class TestApi(IsolatedAsyncioTestCase):
         async for chunk in resp.iter_content(chunk_size=10000):
             self.assertEqual(
                 {
+                    "seq": 1,
                     "event_type": "job_registered",
                     "job_name": "task1",
                     "crontab": None,
                     "enabled": True,
                     "error": None,
+                    "attempt": None,
                     "timestamp": mock.ANY,
                 },
                 json.loads(chunk.decode()),
             )
             break
+
+    async def test_log_stream_since(self):
+        async def task1():
+            ...
+
+        async def task2():
+            ...
+
+        self.manager.register(task1)
+        self.manager.register(task2)
+
+        client = TestClient(app)
+        resp = await client.get("/api/log-stream?since=1", stream=True)
+        async for chunk in resp.iter_content(chunk_size=10000):
+            log = json.loads(chunk.decode())
+            self.assertEqual((2, "task2"), (log["seq"], log["job_name"]))
+            break
+
+    async def test_metrics(self):
+        async def task1():
+            ...
+
+        self.manager.register(task1)
+        await self.manager.start_job("task1")
+        await asyncio.sleep(0.01)
+
+        response = await self.client.get("/api/metrics")
+
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        lines = response.text.splitlines()
+        self.assertIn(
+            'aiocronjob_job_runs_total{job="task1",outcome="finished"} 1', lines
+        )
+        self.assertIn(
+            'aiocronjob_job_run_duration_seconds_bucket{job="task1",le="+Inf"} 1',
+            lines,
+        )
+        self.assertIn(
+            'aiocronjob_job_scheduling_lag_seconds_count{job="task1"} 0', lines
+        )
+        self.assertIn("aiocronjob_running_tasks 0", lines)
+        self.assertIn("aiocronjob_log_buffer_size 3", lines)
+
+    async def test_profile_job(self):
+        def fib(n):
+            return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+        async def task1():
+            fib(15)
+
+        self.manager.register(task1)
+
+        response = await self.client.get("/api/jobs/task1/profile/result")
+        self.assertEqual(404, response.status_code)
+
+        response = await self.client.get("/api/jobs/task1/profile?runs=2")
+        self.assertEqual(200, response.status_code)
+        for _ in range(3):
+            await self.manager.start_job("task1")
+            await asyncio.sleep(0.01)
+
+        response = await self.client.get("/api/jobs/task1/profile/result")
+        self.assertEqual(200, response.status_code)
+        self.assertIn("fib", response.text)
+        # 2 profiled runs calling fib 1973 times each
+        self.assertIn("3946/2", response.text)
+
+        response = await self.client.get(
+            "/api/jobs/task1/profile/result?format=pstats"
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertIn("task1.prof", response.headers["content-disposition"])
+        self.assertTrue(marshal.loads(response.content))
+
+    async def test_list_jobs_not_modified(self):
+        async def task1():
+            ...
+
+        self.manager.register(task1)
+
+        response = await self.client.get("/api/jobs")
+        etag = response.headers["etag"]
+        response = await self.client.get("/api/jobs", headers={"If-None-Match": etag})
+        self.assertEqual(304, response.status_code)
+
+        await self.manager.start_job("task1")
+        await asyncio.sleep(0.01)
+        response = await self.client.get("/api/jobs", headers={"If-None-Match": etag})
+        self.assertEqual(200, response.status_code)
+        self.assertNotEqual(etag, response.headers["etag"])
+        self.assertEqual("finished", response.json()[0]["status"])
+
+    async def test_list_jobs_paginated_and_filtered(self):
+        async def task():
+            ...
+
+        for name in ["a1", "b1", "a2", "a3", "a4"]:
+            self.manager.register(task, name=name)
+        await self.manager.start_job("a3")
+        await asyncio.sleep(0.01)
+
+        response = await self.client.get("/api/jobs?name_prefix=a&limit=2")
+        names = [job["definition"]["name"] for job in response.json()]
+        self.assertEqual(["a1", "a2"], names)
+        cursor = response.headers["x-next-cursor"]
+
+        response = await self.client.get(
+            f"/api/jobs?name_prefix=a&limit=2&cursor={cursor}"
+        )
+        names = [job["definition"]["name"] for job in response.json()]
+        self.assertEqual(["a3", "a4"], names)
+        self.assertNotIn("x-next-cursor", response.headers)
+
+        response = await self.client.get("/api/jobs?status=finished")
+        names = [job["definition"]["name"] for job in response.json()]
+        self.assertEqual(["a3"], names)
+
+        response = await self.client.get("/api/jobs?cursor=-1")
+        self.assertEqual(400, response.status_code)
+        response = await self.client.get("/api/jobs?limit=0")
+        self.assertEqual(400, response.status_code)
+
+    async def test_job_stream(self):
+        async def task1():
+            ...
+
+        async def task2():
+            ...
+
+        self.manager.register(task1)
+        self.manager.register(task2)
+
+        client = TestClient(app)
+        resp = await client.get("/api/job-stream?jobs=task2", stream=True)
+        self.assertTrue(resp.headers["content-type"].startswith("text/event-stream"))
+        chunks = resp.iter_content(chunk_size=10000)
+
+        event, data = (await chunks.__anext__()).decode().splitlines()[:2]
+        self.assertEqual("event: snapshot", event)
+        self.assertEqual(["task2"], list(json.loads(data[len("data: ") :])))
+
+        await self.manager.start_job("task2")
+        event, data = (await chunks.__anext__()).decode().splitlines()[:2]
+        self.assertEqual("event: changes", event)
+        self.assertEqual(
+            "running", json.loads(data[len("data: ") :])["task2"]["status"]
+        )
+
+    async def test_create_app_serves_its_manager(self):
+        async def task():
+            ...
+
+        manager = Manager()
+        manager.register(task, name="other")
+        self.manager.register(task)
+
+        async with httpx.AsyncClient(
+            app=create_app(manager), base_url="http://testserver"
+        ) as client:
+            response = await client.get("/api/jobs")
+        names = [job["definition"]["name"] for job in response.json()]
+        self.assertEqual(["other"], names)
+
+    async def test_core_does_not_import_web_framework(self):
+        code = "import sys, aiocronjob; print('starlite' in sys.modules)"
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(b"False", output.strip())
+
+    async def test_dag(self):
+        async def task():
+            ...
+
+        self.manager.register(task, name="extract")
+        self.manager.register(task, name="load", depends_on=["extract"])
+        manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.05)
+
+        response = await self.client.get("/api/dag")
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            {
+                "extract": {"depends_on": [], "downstream": ["load"]},
+                "load": {"depends_on": ["extract"], "downstream": []},
+            },
+            response.json()["jobs"],
+        )
+        [dag_run] = response.json()["runs"]
+        self.assertEqual("finished", dag_run["status"])
+
+        response = await self.client.get(f"/api/dag/runs/{dag_run['id']}")
+        self.assertEqual(
+            {"extract": "finished", "load": "finished"}, response.json()["jobs"]
+        )
+        response = await self.client.get("/api/dag/runs/1000")
+        self.assertEqual(404, response.status_code)
+
+        await self.manager.shutdown()
+        await manager_task
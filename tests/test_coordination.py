@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+from aiocronjob.coordination import SQLiteCoordinator
+from aiocronjob.manager import Manager
+
+
+class TestSQLiteCoordinator(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "coordination.db")
+        self.coordinators = []
+
+    async def asyncTearDown(self) -> None:
+        for coordinator in self.coordinators:
+            await coordinator.stop()
+        self.tmp_dir.cleanup()
+
+    async def make_coordinator(self, **kwargs) -> SQLiteCoordinator:
+        coordinator = SQLiteCoordinator(self.path, **kwargs)
+        await coordinator.start()
+        self.coordinators.append(coordinator)
+        return coordinator
+
+    async def test_each_run_is_claimed_once(self):
+        first = await self.make_coordinator()
+        second = await self.make_coordinator()
+
+        self.assertTrue(await first.claim("task", 1700000000.0))
+        self.assertFalse(await second.claim("task", 1700000000.0))
+        self.assertTrue(await second.claim("task", 1700000060.0))
+        self.assertTrue(await second.claim("other task", 1700000000.0))
+
+    async def test_leader_failover(self):
+        first = await self.make_coordinator(
+            mode="leader", lease_ttl=0.3, renew_interval=0.05
+        )
+        second = await self.make_coordinator(
+            mode="leader", lease_ttl=0.3, renew_interval=0.05
+        )
+
+        self.assertTrue(await first.claim("task", 1700000000.0))
+        self.assertFalse(await second.claim("task", 1700000000.0))
+
+        # stop renewing without releasing the lease, as if the replica crashed
+        first._renew_task.cancel()
+        await asyncio.sleep(0.5)
+
+        self.assertFalse(await first.claim("task", 1700000060.0))
+        self.assertTrue(await second.claim("task", 1700000060.0))
+
+    async def test_manager_skips_runs_claimed_elsewhere(self):
+        other = await self.make_coordinator()
+        manager = Manager(coordinator=SQLiteCoordinator(self.path))
+
+        async def task():
+            ...
+
+        # the past runs armed below are not misfires
+        manager.register(task, crontab="* * * * *", misfire_grace_time=None)
+        manager_task = asyncio.create_task(manager.run())
+        await asyncio.sleep(0.05)
+
+        job = manager.get_job_info("task")
+        for fire_time, claimed_elsewhere, status in [
+            (job.next_start - 60, True, "pending"),
+            (job.next_start - 120, False, "finished"),
+        ]:
+            if claimed_elsewhere:
+                self.assertTrue(await other.claim("task", fire_time))
+            job.next_start = fire_time
+            manager._arm_timer("task", fire_time)
+            await asyncio.sleep(0.05)
+
+            self.assertEqual(status, job.status)
+
+        await manager.shutdown()
+        await manager_task
@@ -0,0 +1,88 @@
+import io
+import json
+import threading
+from unittest import TestCase
+
+from aiocronjob.logger import (
+    disable_async_logging,
+    enable_async_logging,
+    handler,
+    logger,
+)
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+
+    def write(self, s: str) -> int:
+        self.unblocked.wait(5)
+        return super().write(s)
+
+
+class TestAsyncLogging(TestCase):
+    def tearDown(self) -> None:
+        disable_async_logging()
+
+    def test_logs_are_written_in_the_background(self):
+        stream = SlowStream()
+        enable_async_logging(stream=stream)
+        self.assertNotIn(handler, logger.handlers)
+
+        logger.info("[JOB_STARTED] job=%s", "task", extra={"job": "task"})
+        self.assertEqual("", stream.getvalue())
+
+        stream.unblocked.set()
+        disable_async_logging()
+        self.assertIn("[INFO]", stream.getvalue())
+        self.assertIn("[JOB_STARTED] job=task", stream.getvalue())
+        self.assertIn(handler, logger.handlers)
+
+    def test_full_queue_drops_records(self):
+        stream = SlowStream()
+        async_handler = enable_async_logging(maxsize=2, stream=stream)
+
+        for i in range(10):
+            logger.info("record %s", i)
+        # the first record may already be held by the writer thread
+        self.assertIn(async_handler.dropped, (7, 8))
+
+        stream.unblocked.set()
+        disable_async_logging()
+        self.assertNotIn("record 9", stream.getvalue())
+
+    def test_drop_oldest(self):
+        stream = SlowStream()
+        async_handler = enable_async_logging(
+            maxsize=2, drop_policy="drop_oldest", stream=stream
+        )
+
+        for i in range(10):
+            logger.info("record %s", i)
+        self.assertGreater(async_handler.dropped, 0)
+
+        stream.unblocked.set()
+        disable_async_logging()
+        self.assertIn("record 9", stream.getvalue())
+
+    def test_structured_formats(self):
+        stream = io.StringIO()
+        enable_async_logging(format="json", stream=stream)
+        logger.info("[JOB_FINISHED] job=%s", "my task", extra={"job": "my task"})
+        disable_async_logging()
+
+        record = json.loads(stream.getvalue())
+        self.assertEqual("INFO", record["level"])
+        self.assertEqual("my task", record["job"])
+        self.assertEqual("[JOB_FINISHED] job=my task", record["message"])
+
+        stream = io.StringIO()
+        enable_async_logging(format="kv", stream=stream)
+        logger.info("[JOB_FINISHED] job=%s", "my task", extra={"job": "my task"})
+        disable_async_logging()
+
+        self.assertIn(
+            'level=INFO message="[JOB_FINISHED] job=my task" job="my task"',
+            stream.getvalue(),
+        )
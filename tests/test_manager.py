@@ -1,10 +1,39 @@
 import asyncio
 import datetime
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
 from unittest import IsolatedAsyncioTestCase, mock
 
-from aiocronjob import State
+import pytz
+
+from aiocronjob import State, VirtualClock
+from aiocronjob.exceptions import JobAlreadyRunningException
 from aiocronjob.logger import logger
-from aiocronjob.manager import Manager
+from aiocronjob.manager import DAG_RUN_HISTORY, Manager
+from aiocronjob.models import JobLog
+from aiocronjob.monitor import LoopMonitor, TimedCoroutine
+from aiocronjob.persistence import StateJournal
+
+
+def cpu_bound_job():
+    return sum(range(1000))
+
+
+def endless_job():
+    time.sleep(60)
+
+
+async def worker_pid_job():
+    await asyncio.sleep(0.1)
+    raise ValueError(os.getpid())
+
+
+async def endless_async_job():
+    await asyncio.sleep(60)
 
 
 class TestManager(IsolatedAsyncioTestCase):
@@ -78,6 +107,21 @@ class TestManager(IsolatedAsyncioTestCase):
                         "crontab": None,
                         "enabled": True,
                         "name": "task",
+                        "overlap": "skip",
+                        "max_instances": 1,
+                        "max_queued": 1,
+                        "resource_pool": None,
+                        "executor": "asyncio",
+                        "terminate_on_cancel": False,
+                        "misfire": "coalesce",
+                        "misfire_grace_time": 1.0,
+                        "misfire_max_runs": 10,
+                        "jitter": 0.0,
+                        "max_attempts": 1,
+                        "retry_backoff": 1.0,
+                        "retry_max_backoff": 300.0,
+                        "timeout": None,
+                        "depends_on": [],
                     },
                     "last_finish": None,
                     "last_finish_status": None,
@@ -85,6 +129,10 @@ class TestManager(IsolatedAsyncioTestCase):
                     "last_status": None,
                     "next_start": None,
                     "status": "registered",
+                    "last_cpu_time": None,
+                    "loop_stalls": None,
+                    "loop_stall_time": None,
+                    "attempt": None,
                 }],
             },
             state.dict(),
@@ -131,8 +179,848 @@ class TestManager(IsolatedAsyncioTestCase):
         self.manager_task = asyncio.create_task(self.manager.run())
 
         self.manager.register(task)
-        # each cycle lasts 1.5 secs, so the task stays as 'registered' max 1.5 secs
+        # the scheduler only picks up the new job once it gets control back
         self.assertEqual("registered", self.manager.get_job_info("task").status)
 
         await asyncio.sleep(3)
         self.assertEqual("failed", self.manager.get_job_info("task").status)
+
+    async def test_job_starts_without_polling_delay(self):
+        async def task():
+            await asyncio.sleep(1)
+
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.01)
+
+        self.manager.register(task)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual("running", self.manager.get_job_info("task").status)
+
+    async def test_crontab_job_waits_for_next_start(self):
+        async def task():
+            ...
+
+        self.manager.register(task, crontab="0 0 1 1 *")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.05)
+
+        job_info = self.manager.get_job_info("task")
+        self.assertEqual("pending", job_info.status)
+        self.assertGreater(job_info.next_start, datetime.datetime.now().timestamp())
+
+    async def test_jobs_share_compiled_schedule(self):
+        async def task1():
+            ...
+
+        async def task2():
+            ...
+
+        self.manager.register(task1, crontab="*/5 * * * *")
+        self.manager.register(task2, crontab="*/5 * * * *")
+
+        self.assertIs(
+            self.manager.get_job_info("task1").definition.schedule,
+            self.manager.get_job_info("task2").definition.schedule,
+        )
+
+        upcoming = self.manager.get_job_upcoming_starts("task1", 3)
+        self.assertEqual([300, 300], [b - a for a, b in zip(upcoming, upcoming[1:])])
+
+    async def test_register_invalid_crontab_error(self):
+        async def task():
+            ...
+
+        with self.assertRaises(ValueError):
+            self.manager.register(task, crontab="not a crontab")
+
+    async def test_generate_logs_pushes_new_logs(self):
+        async def task():
+            ...
+
+        logs = self.manager.generate_logs()
+        next_log = asyncio.create_task(logs.__anext__())
+        await asyncio.sleep(0)
+        self.assertFalse(next_log.done())
+
+        self.manager.register(task)
+
+        log: JobLog = await asyncio.wait_for(next_log, 0.1)
+        self.assertEqual(("job_registered", 1), (log.event_type, log.seq))
+        await logs.aclose()
+
+    async def test_generate_logs_lagging_consumer_resyncs(self):
+        manager = Manager(log_subscriber_queue_size=1)
+
+        async def task():
+            ...
+
+        logs = manager.generate_logs()
+        manager.register(task, name="task1")
+        self.assertEqual(1, (await logs.__anext__()).seq)
+
+        for i in range(2, 5):
+            manager.register(task, name=f"task{i}")
+
+        self.assertEqual([2, 3, 4], [(await logs.__anext__()).seq for _ in range(3)])
+        await logs.aclose()
+
+    async def test_generate_logs_drops_slow_consumer(self):
+        manager = Manager(log_subscriber_queue_size=1, slow_consumer_policy="drop")
+
+        async def task():
+            ...
+
+        logs = manager.generate_logs()
+        manager.register(task, name="task1")
+        self.assertEqual(1, (await logs.__anext__()).seq)
+
+        for i in range(2, 5):
+            manager.register(task, name=f"task{i}")
+
+        with self.assertRaises(StopAsyncIteration):
+            await logs.__anext__()
+
+    async def test_log_store_is_bounded(self):
+        manager = Manager(log_capacity=3)
+
+        async def task():
+            ...
+
+        for i in range(1, 6):
+            manager.register(task, name=f"task{i}")
+
+        self.assertEqual([3, 4, 5], [log.seq for log in manager.get_logs()])
+        self.assertEqual(
+            ["task4"], [log.job_name for log in manager.get_logs(job_name="task4")]
+        )
+        self.assertEqual([], manager.get_logs(job_name="task1"))
+
+        evicted = manager.get_evicted_logs(0)
+        self.assertEqual((1, 2), (evicted.from_seq, evicted.to_seq))
+        self.assertIsNone(manager.get_evicted_logs(2))
+
+    async def test_log_record_serialized_once(self):
+        async def task():
+            ...
+
+        self.manager.register(task)
+        log = self.manager.get_logs()[0]
+
+        self.assertIs(log.json_line(), log.json_line())
+        self.assertEqual(log.to_job_log().dict(), json.loads(log.json_line()))
+
+    async def test_state_journal_restores_state(self):
+        async def task():
+            ...
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "journal")
+
+            manager = Manager(state_journal=StateJournal(path))
+            manager.register(task, crontab="0 0 1 1 *")
+            manager_task = asyncio.create_task(manager.run())
+            await asyncio.sleep(0.01)
+            await manager.start_job("task")
+            await asyncio.sleep(0.01)
+            await manager.shutdown()
+            await manager_task
+            finished_job = manager.get_job_info("task")
+
+            self.manager = Manager(state_journal=StateJournal(path))
+            self.manager.register(task, crontab="0 0 1 1 *")
+            self.manager_task = asyncio.create_task(self.manager.run())
+            await asyncio.sleep(0.01)
+
+            job = self.manager.get_job_info("task")
+            self.assertEqual("finished", job.status)
+            self.assertEqual("finished", job.last_finish_status)
+            self.assertEqual(finished_job.last_finish, job.last_finish)
+            self.assertEqual(finished_job.next_start, job.next_start)
+
+            await self.manager.shutdown()
+
+    async def test_state_journal_compaction(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "journal")
+
+            journal = StateJournal(path, compact_every=2)
+            journal.start()
+            journal.append("task", {"status": "running"})
+            journal.append("task", {"status": "finished"})
+            journal.append("other", {"status": "running"})
+            journal.close()
+
+            # a torn record left by a crash is ignored
+            with open(path, "a") as f:
+                f.write('{"name": "other", "sta')
+
+            journal = StateJournal(path)
+            state = journal.load()
+            self.assertEqual(
+                [
+                    {"definition": {"name": "task"}, "status": "finished"},
+                    {"definition": {"name": "other"}, "status": "running"},
+                ],
+                state.jobs_info,
+            )
+
+            # and the records written after the crash are not appended to it
+            journal.start()
+            journal.append("other", {"status": "failed"})
+            journal.append("new", {"status": "running"})
+            journal.close()
+            state = StateJournal(path).load()
+
+        self.assertEqual(
+            [
+                {"definition": {"name": "task"}, "status": "finished"},
+                {"definition": {"name": "other"}, "status": "failed"},
+                {"definition": {"name": "new"}, "status": "running"},
+            ],
+            state.jobs_info,
+        )
+
+    async def test_overlap_skip(self):
+        async def task():
+            await asyncio.sleep(1)
+
+        self.manager.register(task)
+        await self.manager.start_job("task")
+        await self.manager._request_run("task", datetime.datetime.now().timestamp())
+
+        self.assertEqual(1, len(self.manager._tasks["task"]))
+        self.assertEqual("job_skipped", self.manager.get_logs()[-1].event_type)
+
+    async def test_overlap_queue(self):
+        async def task():
+            await asyncio.sleep(0.1)
+
+        self.manager.register(task, overlap="queue")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.01)
+        await self.manager._request_run("task", datetime.datetime.now().timestamp())
+
+        self.assertEqual("running", self.manager.get_job_info("task").status)
+        await asyncio.sleep(0.15)
+        self.assertEqual("running", self.manager.get_job_info("task").status)
+        await asyncio.sleep(0.1)
+        self.assertEqual("finished", self.manager.get_job_info("task").status)
+        self.assertEqual(
+            2, len(self.manager.get_logs(job_name="task", event_type="job_finished"))
+        )
+
+    async def test_overlap_queue_is_bounded(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+
+        async def slow():
+            await clock.sleep(150)
+
+        self.manager.register(slow, crontab="* * * * *", overlap="queue", max_queued=2)
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(3600)
+
+        self.assertEqual(2, self.manager._waiting_counts["slow"])
+        self.assertEqual(2, len(self.manager._waiting_runs))
+        self.assertTrue(self.manager.get_logs(event_type="job_skipped"))
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_overlap_replace(self):
+        async def task():
+            await asyncio.sleep(1)
+
+        self.manager.register(task, overlap="replace")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.01)
+        first_run = self.manager._tasks["task"][0]
+        await self.manager._request_run("task", datetime.datetime.now().timestamp())
+        await asyncio.sleep(0.01)
+
+        self.assertTrue(first_run.cancelled())
+        self.assertEqual("running", self.manager.get_job_info("task").status)
+        self.assertIsNot(first_run, self.manager._tasks["task"][0])
+
+    async def test_overlap_parallel(self):
+        async def task():
+            await asyncio.sleep(1)
+
+        self.manager.register(task, overlap="parallel", max_instances=2)
+        await self.manager.start_job("task")
+        await self.manager.start_job("task")
+
+        self.assertEqual(2, len(self.manager._tasks["task"]))
+        with self.assertRaises(JobAlreadyRunningException):
+            await self.manager.start_job("task")
+
+    async def test_max_concurrency(self):
+        self.manager = Manager(max_concurrency=1)
+        self.manager.add_resource_pool("db", 1)
+
+        async def task():
+            await asyncio.sleep(0.1)
+
+        self.manager.register(task, name="task1")
+        self.manager.register(task, name="task2", resource_pool="db")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.01)
+
+        self.assertEqual("running", self.manager.get_job_info("task1").status)
+        self.assertEqual("queued", self.manager.get_job_info("task2").status)
+        await asyncio.sleep(0.1)
+        self.assertEqual("finished", self.manager.get_job_info("task1").status)
+        self.assertEqual("running", self.manager.get_job_info("task2").status)
+
+    async def test_register_unknown_resource_pool_error(self):
+        async def task():
+            ...
+
+        with self.assertRaises(Exception) as ctx:
+            self.manager.register(task, resource_pool="db")
+
+        self.assertEqual("Resource pool <db> does not exist.", str(ctx.exception))
+
+    async def test_thread_executor(self):
+        def task():
+            time.sleep(0.1)
+
+        def failing_task():
+            raise ValueError("err")
+
+        self.manager.register(task, executor="thread")
+        self.manager.register(failing_task, executor="thread")
+        await self.manager.start_job("task")
+        await self.manager.start_job("failing_task")
+        await asyncio.sleep(0.01)
+
+        self.assertEqual("running", self.manager.get_job_info("task").status)
+        await asyncio.sleep(0.15)
+        self.assertEqual("finished", self.manager.get_job_info("task").status)
+        self.assertEqual("failed", self.manager.get_job_info("failing_task").status)
+
+    async def test_thread_executor_cooperative_cancel(self):
+        def task(cancel_event: threading.Event):
+            cancel_event.wait(5)
+
+        self.manager.register(task, executor="thread")
+        await self.manager.start_job("task")
+        await asyncio.sleep(0.01)
+        await self.manager.cancel_job("task")
+        await asyncio.sleep(0.05)
+
+        self.assertEqual("cancelled", self.manager.get_job_info("task").status)
+
+    async def test_process_executor(self):
+        self.manager.register(cpu_bound_job, executor="process")
+        self.manager.register(endless_job, executor="process", terminate_on_cancel=True)
+        await self.manager.start_job("cpu_bound_job")
+        await self.manager.start_job("endless_job")
+
+        for _ in range(100):
+            await asyncio.sleep(0.1)
+            if self.manager.get_job_info("cpu_bound_job").status == "finished":
+                break
+        self.assertEqual("finished", self.manager.get_job_info("cpu_bound_job").status)
+
+        await self.manager.cancel_job("endless_job")
+        await asyncio.sleep(0.1)
+        self.assertEqual("cancelled", self.manager.get_job_info("endless_job").status)
+
+    async def test_own_processes_are_bounded(self):
+        self.manager = Manager(process_pool_size=1)
+        for name in ["endless_job", "other_endless_job"]:
+            self.manager.register(
+                endless_job, name=name, executor="process", terminate_on_cancel=True
+            )
+            await self.manager.start_job(name)
+        await asyncio.sleep(0.5)
+
+        self.assertEqual(1, len(multiprocessing.active_children()))
+        await self.manager.cancel_job("endless_job")
+        await self.manager.cancel_job("other_endless_job")
+
+    async def test_worker_processes(self):
+        self.manager = Manager(workers=2)
+        self.manager.register(worker_pid_job)
+        self.manager.register(endless_async_job)
+        self.manager_task = asyncio.create_task(self.manager.run())
+
+        for _ in range(100):
+            await asyncio.sleep(0.1)
+            if self.manager.get_job_info("worker_pid_job").status == "failed":
+                break
+        log = self.manager.get_logs(job_name="worker_pid_job")[-1]
+        self.assertEqual("job_failed", log.event_type)
+        self.assertNotEqual(str(os.getpid()), log.error)
+
+        self.assertEqual("running", self.manager.get_job_info("endless_async_job").status)
+        await self.manager.cancel_job("endless_async_job")
+        await asyncio.sleep(0.1)
+        self.assertEqual(
+            "cancelled", self.manager.get_job_info("endless_async_job").status
+        )
+
+    async def test_virtual_clock_simulates_a_month(self):
+        start = datetime.datetime(2021, 1, 1, tzinfo=pytz.utc).timestamp()
+        clock = VirtualClock(start=start)
+        self.manager = Manager(clock=clock)
+
+        async def hourly():
+            await self.manager.clock.sleep(600)
+
+        async def nightly():
+            await self.manager.clock.sleep(3600)
+
+        self.manager.register(hourly, crontab="0 * * * *")
+        self.manager.register(nightly, crontab="30 2 * * *")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(31 * 24 * 3600 + 1800)
+
+        hourly_starts = self.manager.get_logs(
+            job_name="hourly", event_type="job_started"
+        )
+        nightly_finishes = self.manager.get_logs(
+            job_name="nightly", event_type="job_finished"
+        )
+        self.assertEqual(31 * 24, len(hourly_starts))
+        self.assertEqual(31, len(nightly_finishes))
+        self.assertEqual(start + 3600, hourly_starts[0].timestamp)
+        self.assertEqual(start + 3.5 * 3600, nightly_finishes[0].timestamp)
+        self.assertEqual(
+            "finished", self.manager.get_job_info("hourly").last_finish_status
+        )
+
+    async def test_metrics_track_runs(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+
+        async def task():
+            await self.manager.clock.sleep(20)
+
+        self.manager.register(task, crontab="* * * * *")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(210)
+
+        metrics = self.manager._metrics.jobs["task"]
+        self.assertEqual(3, metrics.runs["finished"])
+        self.assertEqual(3, metrics.lag.count)
+        self.assertEqual(0, metrics.lag.sum)
+        self.assertEqual(60, metrics.duration.sum)
+
+    async def test_loop_monitor_blames_blocking_job(self):
+        self.manager = Manager(loop_monitor=LoopMonitor(interval=0.02, threshold=0.1))
+
+        async def blocking():
+            await asyncio.sleep(0.1)
+            time.sleep(0.3)
+
+        async def busy():
+            sum(range(10**6))
+
+        self.manager.register(blocking)
+        self.manager.register(busy)
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.6)
+
+        blocking_info = self.manager.get_job_info("blocking")
+        self.assertEqual(1, blocking_info.loop_stalls)
+        self.assertGreaterEqual(blocking_info.loop_stall_time, 0.2)
+        self.assertLess(blocking_info.last_cpu_time, 0.1)
+        self.assertGreater(self.manager.get_job_info("busy").last_cpu_time, 0)
+        self.assertIsNone(self.manager.get_job_info("busy").loop_stalls)
+
+        stats = self.manager.get_loop_stats()
+        self.assertEqual("blocking", stats["stalls"][-1]["task_name"])
+        self.assertGreaterEqual(stats["max_lag"], 0.2)
+
+    async def test_timed_coroutine_awaited(self):
+        async def busy():
+            await asyncio.sleep(0)
+            sum(range(10**6))
+            return 42
+
+        coroutine = TimedCoroutine(busy())
+        self.assertEqual(42, await coroutine)
+        self.assertGreater(coroutine.cpu_time, 0)
+
+    async def test_generate_job_updates(self):
+        async def task1():
+            ...
+
+        async def task2():
+            ...
+
+        self.manager.register(task1)
+        self.manager.register(task2)
+        updates = self.manager.generate_job_updates({"task1"})
+
+        kind, jobs = await updates.__anext__()
+        self.assertEqual("snapshot", kind)
+        self.assertEqual(["task1"], list(jobs))
+        self.assertEqual("registered", jobs["task1"]["status"])
+
+        await self.manager.start_job("task2")
+        await self.manager.start_job("task1")
+        kind, jobs = await updates.__anext__()
+        self.assertEqual("changes", kind)
+        self.assertEqual({"task1"}, set(jobs))
+        self.assertEqual("running", jobs["task1"]["status"])
+        self.assertNotIn("definition", jobs["task1"])
+
+        kind, jobs = await updates.__anext__()
+        self.assertEqual(
+            {"status", "last_finish", "last_finish_status"}, set(jobs["task1"])
+        )
+        await updates.aclose()
+
+    async def test_shutdown_drains_running_jobs(self):
+        self.manager = Manager(shutdown_drain_timeout=0.3)
+
+        async def short():
+            await asyncio.sleep(0.1)
+
+        async def long():
+            await asyncio.sleep(10)
+
+        self.manager.register(short)
+        self.manager.register(long)
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.01)
+
+        started = time.monotonic()
+        await self.manager.shutdown()
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual("finished", self.manager.get_job_info("short").status)
+        self.assertEqual("cancelled", self.manager.get_job_info("long").status)
+
+    async def test_shutdown_does_not_wait_for_jobs_ignoring_cancellation(self):
+        self.manager = Manager(shutdown_cancel_timeout=0.2)
+
+        def stubborn(cancel_event: threading.Event):
+            time.sleep(0.5)
+
+        self.manager.register(stubborn, executor="thread")
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await asyncio.sleep(0.01)
+
+        started = time.monotonic()
+        await self.manager.shutdown()
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual("running", self.manager.get_job_info("stubborn").status)
+
+    async def test_misfire_policies(self):
+        midnight = datetime.datetime(2021, 1, 1, tzinfo=pytz.utc).timestamp()
+
+        async def task():
+            ...
+
+        for policy, down_since, expected_starts in [
+            ("skip", 5 * 3600, []),
+            ("coalesce", 5 * 3600, [1800]),
+            ("all", 5 * 3600, [1800, 1810, 1820]),
+            # no fire time since a saved start of another crontab
+            ("skip", -300, []),
+            ("coalesce", -300, []),
+            ("all", -300, []),
+        ]:
+            with self.subTest(policy=policy, down_since=down_since):
+                # restarted half an hour after midnight
+                clock = VirtualClock(start=midnight + 1800)
+                self.manager = Manager(clock=clock, catch_up_rate=0.1)
+                self.manager.register(
+                    task, crontab="0 * * * *", misfire=policy, misfire_max_runs=3
+                )
+                self.manager.set_initial_state(
+                    State(
+                        created_at=datetime.datetime.now(),
+                        jobs_info=[
+                            {
+                                "definition": {"name": "task"},
+                                "status": "finished",
+                                "next_start": midnight - down_since,
+                            }
+                        ],
+                    )
+                )
+                self.manager_task = asyncio.create_task(self.manager.run())
+                await clock.sleep(60)
+
+                starts = self.manager.get_logs(event_type="job_started")
+                self.assertEqual(
+                    expected_starts, [log.timestamp - midnight for log in starts]
+                )
+                self.assertEqual(
+                    1, len(self.manager.get_logs(event_type="job_misfired"))
+                )
+                self.assertEqual(midnight + 3600, self.manager._jobs["task"].next_start)
+                await self.manager.shutdown()
+                await self.manager_task
+
+    async def test_start_offsets(self):
+        midnight = datetime.datetime(2021, 1, 1, tzinfo=pytz.utc).timestamp()
+        clock = VirtualClock(start=midnight)
+        self.manager = Manager(clock=clock, spread=1.0)
+
+        async def task():
+            ...
+
+        names = [f"job-{i}" for i in range(20)]
+        for name in names:
+            self.manager.register(task, crontab="*/5 * * * *", name=name)
+        self.manager.register(task, crontab="*/5 * * * *", name="jittered", jitter=30)
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(300)
+
+        offsets = {
+            log.definition.name: log.timestamp - midnight
+            for log in self.manager.get_logs(event_type="job_started")
+        }
+        self.assertEqual(set(names) | {"jittered"}, set(offsets))
+        self.assertGreater(len(set(offsets.values())), 15)
+        self.assertTrue(all(0 <= offset < 300 for offset in offsets.values()))
+        self.assertLess(offsets["jittered"], 30)
+
+        # the same offsets on every fire time, and in every manager
+        other = Manager(clock=clock, spread=1.0)
+        for name in names:
+            other.register(task, crontab="*/5 * * * *", name=name)
+            self.assertEqual(
+                [midnight + 300 + offsets[name], midnight + 600 + offsets[name]],
+                other.get_job_upcoming_starts(name, 2),
+            )
+            self.assertEqual(
+                midnight + 300 + offsets[name], self.manager._jobs[name].next_start
+            )
+
+        # an irregular schedule gets the same offset whenever it is registered
+        monthly = []
+        for month in [3, 12]:
+            start = datetime.datetime(2021, month, 15, tzinfo=pytz.utc)
+            other = Manager(clock=VirtualClock(start=start.timestamp()), spread=0.5)
+            other.register(task, crontab="0 0 1 * *")
+            monthly.append(other._start_offsets["task"])
+        self.assertEqual(monthly[0], monthly[1])
+        self.assertLess(monthly[0], 0.5 * 28 * 24 * 3600)
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_retries(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+        failures = [ConnectionError("blip"), ConnectionError("blip")]
+
+        async def flaky():
+            if failures:
+                raise failures.pop(0)
+
+        async def broken():
+            raise ValueError("bug")
+
+        self.manager.register(flaky, max_attempts=3, retry_backoff=10)
+        self.manager.register(
+            broken, max_attempts=3, retry_on=(ConnectionError,), name="broken"
+        )
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(0)
+        await self.manager.start_job("flaky")
+        await self.manager.start_job("broken")
+        await clock.sleep(60)
+
+        starts = self.manager.get_logs(job_name="flaky", event_type="job_started")
+        self.assertEqual([1, 2, 3], [log.attempt for log in starts])
+        # backoff of 10 then 20 seconds, at least half of it
+        self.assertTrue(5 <= starts[1].timestamp - starts[0].timestamp <= 10)
+        self.assertTrue(10 <= starts[2].timestamp - starts[1].timestamp <= 20)
+        self.assertEqual(
+            [2, 3],
+            [
+                log.attempt
+                for log in self.manager.get_logs(
+                    job_name="flaky", event_type="job_retrying"
+                )
+            ],
+        )
+        flaky_job = self.manager.get_job_info("flaky")
+        self.assertEqual("finished", flaky_job.status)
+        self.assertEqual(3, flaky_job.attempt)
+
+        broken_job = self.manager.get_job_info("broken")
+        self.assertEqual("failed", broken_job.status)
+        self.assertIsNone(broken_job.next_start)
+        self.assertEqual(
+            1, len(self.manager.get_logs(job_name="broken", event_type="job_started"))
+        )
+        self.assertNotIn("retry_on", self.manager.get_serialized_job("broken").decode())
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_timeout(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+
+        async def hanging():
+            await clock.sleep(3600)
+
+        self.manager.register(hanging, crontab="* * * * *", timeout=10)
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(75)
+
+        starts = self.manager.get_logs(event_type="job_started")
+        self.assertEqual([60], [log.timestamp for log in starts])
+        timed_out = self.manager.get_logs(event_type="job_timed_out")
+        self.assertEqual([70], [log.timestamp for log in timed_out])
+        job = self.manager.get_job_info("hanging")
+        self.assertEqual("timed_out", job.status)
+        self.assertEqual(120, job.next_start)
+
+        await clock.sleep(60)
+        self.assertEqual(2, len(self.manager.get_logs(event_type="job_timed_out")))
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_dependencies(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+        failing = set()
+
+        def step(name):
+            async def run():
+                await clock.sleep(10)
+                if name in failing:
+                    raise ValueError(name)
+
+            return run
+
+        self.manager.register(step("extract"), name="extract")
+        self.manager.register(step("a"), name="a", depends_on=["extract"])
+        self.manager.register(step("b"), name="b", depends_on=["extract"])
+        self.manager.register(step("load"), name="load", depends_on=["a", "b", "a"])
+        # registered before the job it depends on, which would close a cycle
+        self.manager.register(step("x"), name="x", depends_on=["y"])
+        with self.assertRaises(Exception):
+            self.manager.register(step("y"), name="y", depends_on=["load", "x"])
+
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(60)
+
+        def starts(name):
+            logs = self.manager.get_logs(job_name=name, event_type="job_started")
+            return [log.timestamp for log in logs]
+
+        # extract runs once at startup, the others only when triggered
+        self.assertEqual([0], starts("extract"))
+        self.assertEqual([10], starts("a"))
+        self.assertEqual([10], starts("b"))
+        self.assertEqual([20], starts("load"))
+        self.assertFalse(self.manager.get_logs(event_type="job_skipped"))
+        self.assertEqual(
+            {
+                "id": 1,
+                "started_at": 0,
+                "jobs": {
+                    "extract": "finished",
+                    "a": "finished",
+                    "b": "finished",
+                    "load": "finished",
+                },
+                "status": "finished",
+            },
+            self.manager.get_dag_run(1),
+        )
+
+        failing.add("b")
+        await self.manager.start_job("extract")
+        await clock.sleep(60)
+        self.assertEqual([20], starts("load"))
+        dag_run = self.manager.get_dag_runs()[0]
+        self.assertEqual("failed", dag_run["status"])
+        self.assertEqual("skipped", dag_run["jobs"]["load"])
+        self.assertEqual(["a", "b"], self.manager.get_dag()["load"]["depends_on"])
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_dependencies_fan_in(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+
+        def step(duration):
+            async def run():
+                await clock.sleep(duration)
+
+            return run
+
+        # two independent roots, each starting its own graph run
+        self.manager.register(step(10), crontab="0 * * * *", name="a")
+        self.manager.register(step(10), crontab="30 * * * *", name="b")
+        self.manager.register(step(30), name="c", depends_on=["a", "b"])
+        self.manager.register(step(10), name="d", depends_on=["c"])
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(3660)
+
+        # c and d ran once, as part of both graph runs
+        starts = self.manager.get_logs(job_name="d", event_type="job_started")
+        self.assertEqual([3640], [log.timestamp for log in starts])
+        self.assertEqual(
+            [
+                {"a": "finished", "c": "finished", "d": "finished"},
+                {"b": "finished", "c": "finished", "d": "finished"},
+            ],
+            [dag_run["jobs"] for dag_run in self.manager.get_dag_runs()],
+        )
+        self.assertEqual(
+            ["finished", "finished"],
+            [dag_run["status"] for dag_run in self.manager.get_dag_runs()],
+        )
+
+        # triggered again while still running, c is skipped in both graph runs
+        await self.manager.start_job("c")
+        await self.manager.start_job("a")
+        await self.manager.start_job("b")
+        await clock.sleep(60)
+        latest = self.manager.get_dag_runs(2)
+        self.assertEqual(
+            [
+                {"b": "finished", "c": "skipped", "d": "skipped"},
+                {"a": "finished", "c": "skipped", "d": "skipped"},
+            ],
+            [dag_run["jobs"] for dag_run in latest],
+        )
+        self.assertEqual(
+            ["finished", "finished"], [dag_run["status"] for dag_run in latest]
+        )
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_process_timeout(self):
+        self.manager.register(endless_job, executor="process", timeout=0.2)
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await self.manager.start_job("endless_job")
+
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if self.manager.get_job_info("endless_job").status == "timed_out":
+                break
+        self.assertEqual("timed_out", self.manager.get_job_info("endless_job").status)
+        self.assertNotIn("endless_job", self.manager._tasks)
+        await self.manager.shutdown()
+        await self.manager_task
+
+    async def test_dependencies_forget_old_graph_runs(self):
+        clock = VirtualClock(start=0)
+        self.manager = Manager(clock=clock)
+
+        async def task():
+            ...
+
+        self.manager.register(task, crontab="* * * * *", name="a")
+        self.manager.register(task, crontab="0 0 1 1 *", name="b")
+        self.manager.register(task, name="c", depends_on=["a", "b"])
+        self.manager_task = asyncio.create_task(self.manager.run())
+        await clock.sleep(3 * 3600)
+
+        waiting_for = self.manager._finished_upstreams["c"]["a"]
+        self.assertLessEqual(len(waiting_for), DAG_RUN_HISTORY)
+        self.assertTrue(all(run_id in self.manager._dag_runs for run_id in waiting_for))
+        await self.manager.shutdown()
+        await self.manager_task
@@ -0,0 +1,49 @@
+import datetime
+from unittest import TestCase, mock
+
+import pytz
+
+from aiocronjob.schedule import Schedule
+
+MIDNIGHT = datetime.datetime(2021, 1, 1, tzinfo=pytz.utc).timestamp()
+
+
+class TestSchedule(TestCase):
+    def test_window_is_shared_by_nearby_timestamps(self):
+        schedule = Schedule("*/5 * * * *")
+
+        with mock.patch.object(
+            schedule, "_next_after", wraps=schedule._next_after
+        ) as next_after:
+            # like jobs with different start offsets, looking from different times
+            for _ in range(10):
+                for timestamp in [MIDNIGHT + 60, MIDNIGHT - 60, MIDNIGHT + 300]:
+                    self.assertEqual(
+                        Schedule("*/5 * * * *").upcoming(timestamp, 2),
+                        schedule.upcoming(timestamp, 2),
+                    )
+        # each fire time from 00:00 to 00:15 computed once
+        self.assertEqual(5, next_after.call_count)
+
+    def test_window_starts_over_far_away(self):
+        schedule = Schedule("0 * * * *")
+
+        # the window starts over far back
+        self.assertEqual(
+            [MIDNIGHT + 31 * 3600], schedule.upcoming(MIDNIGHT + 30 * 3600, 1)
+        )
+        self.assertEqual(
+            [MIDNIGHT + 3600, MIDNIGHT + 7200], schedule.upcoming(MIDNIGHT, 2)
+        )
+        self.assertEqual(MIDNIGHT + 3600, schedule.next_after(MIDNIGHT + 1))
+        self.assertEqual(MIDNIGHT + 10800, schedule.next_after(MIDNIGHT + 7200))
+
+        # and far ahead, without the fire times in between
+        with mock.patch.object(
+            schedule, "_next_after", wraps=schedule._next_after
+        ) as next_after:
+            year = 365 * 24 * 3600
+            self.assertEqual(
+                MIDNIGHT + year + 3600, schedule.next_after(MIDNIGHT + year)
+            )
+        self.assertEqual(1, next_after.call_count)